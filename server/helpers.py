@@ -1,6 +1,7 @@
 import os
 import re
 import sys
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple, Union
 from collections import OrderedDict
@@ -146,6 +147,91 @@ visibility: {visibility}
     return frontmatter_content
 
 
+class LRUCache:
+    """A thread-safe least recently used cache that counts hits, misses and
+    evictions so that its size can be tuned.
+
+    Besides the number of entries, the cache can be limited to `maxbytes`,
+    counting the size given for each entry when it is cached."""
+
+    def __init__(self, maxsize: int = 128, maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for the key or `default` if missing."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int = 0) -> None:
+        """Cache the value, evicting the least recently used entries if the
+        cache is full."""
+        if self.maxsize <= 0:
+            return
+        if self.maxbytes is not None and size > self.maxbytes:
+            # Never worth evicting everything else for
+            self.pop(key)
+            return
+        with self._lock:
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes and self._data
+            ):
+                evicted, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.nbytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+            if self.maxbytes is not None:
+                stats["bytes"] = self.nbytes
+                stats["maxbytes"] = self.maxbytes
+            return stats
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+
 class CustomBaseModel(BaseModel):
     class Config:
         alias_generator = camel_case
@@ -1,7 +1,7 @@
 import os
-from typing import List, Literal
+from typing import List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, UploadFile, Request, Query, Form
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, UploadFile, Request, Response, Query, Form
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
@@ -11,10 +11,10 @@ from attachments.models import AttachmentCreateResponse
 from auth.base import BaseAuth
 from auth.models import Login, Token
 from global_config import AuthType, GlobalConfig, GlobalConfigResponseModel
-from helpers import replace_base_href
+from helpers import LRUCache, get_env, replace_base_href
 from logger import logger
 from notes.base import BaseNotes
-from notes.models import Note, NoteCreate, NoteUpdate, SearchResult, NoteImport, NoteImageImport, NoteXyzImport, NotePlaintextImport, NotePasteImport
+from notes.models import DEFAULT_PAGE_SIZE, Note, NoteCreate, NoteSummary, NoteUpdate, Page, SearchResult, NoteImport, NoteImageImport, NoteXyzImport, NotePlaintextImport, NotePasteImport
 from tags.base import BaseTags
 from tags.models import TagConfig, TagsConfig, TagConfigUpdate, TagBackupInfo
 
@@ -46,11 +46,25 @@ def is_authenticated(request: Request) -> bool:
         logger.info(f"Authentication check failed: {e}")
         return False
 
+
+def set_page_headers(response: Response, page: Page) -> None:
+    """Expose the pagination details of a page of results as response
+    headers so that the response body stays a plain list."""
+    response.headers["X-Total-Count"] = str(page.total)
+    response.headers["X-Page"] = str(page.page)
+    response.headers["X-Page-Size"] = str(page.page_size)
+    response.headers["X-Page-Count"] = str(page.page_count)
+
 global_config = GlobalConfig()
 auth: BaseAuth = global_config.load_auth()
 note_storage: BaseNotes = global_config.load_note_storage()
 attachment_storage: BaseAttachments = global_config.load_attachment_storage()
 tag_storage: BaseTags = global_config.load_tag_storage()
+# Parsed cclib data read by ccget, limited by the memory its arrays use
+ccdata_cache = LRUCache(
+    maxsize=get_env("SBNOTE_CCDATA_CACHE_SIZE", default=128, cast_int=True),
+    maxbytes=get_env("SBNOTE_CCDATA_CACHE_BYTES", default=256 * 1024 * 1024, cast_int=True),
+)
 auth_deps = [Depends(auth.authenticate)] if auth else []
 router = APIRouter()
 app = FastAPI(
@@ -155,22 +169,31 @@ def get_note(filename: str, request: Request):
 # Get Notes List
 @router.get(
     "/api/notes",
-    response_model=List[Note],
+    response_model=Union[List[Note], List[NoteSummary]],
 )
 def get_notes_list(
     request: Request,
+    response: Response,
     sort: Literal["title", "lastModified", "createdTime", "category", "visibility"] = "lastModified",
     order: Literal["asc", "desc"] = "desc",
     limit: int = None,
+    page: int = Query(None, ge=1),
+    view: Literal["full", "summary"] = "full",
 ):
-    """Get a list of all notes."""
+    """Get a list of all notes. If a page is given, the limit is the page size
+    and the total count is returned in the X-Total-Count header. The summary
+    view returns an excerpt instead of the content of each note."""
     if sort == "lastModified":
         sort = "last_modified"
     elif sort == "createdTime":
         sort = "created_time"
     # Use public index if not authenticated, main index if authenticated
     use_public_index = not is_authenticated(request)
-    return note_storage.list_notes(sort=sort, order=order, limit=limit, use_public_index=use_public_index)
+    if page is not None:
+        notes_page = note_storage.list_notes_page(sort=sort, order=order, page=page, page_size=limit or DEFAULT_PAGE_SIZE, use_public_index=use_public_index, view=view)
+        set_page_headers(response, notes_page)
+        return notes_page.items
+    return note_storage.list_notes(sort=sort, order=order, limit=limit, use_public_index=use_public_index, view=view)
 
 
 if global_config.auth_type != AuthType.READ_ONLY:
@@ -354,6 +377,15 @@ if global_config.auth_type != AuthType.READ_ONLY:
                 detail=f"Import failed: {str(e)}",
             )
 
+    @router.get("/api/notes/{filename}/parse-status", dependencies=auth_deps)
+    def get_output_parse_status(filename: str):
+        """Get the status of parsing an imported output: "queued", "parsing",
+        "done" or "failed"."""
+        status = note_storage.get_output_parse_status(filename)
+        if status is None:
+            raise HTTPException(404, "No parse job for this note")
+        return status
+
     # Import Paste with new directory structure
     @router.post(
         "/api/notes/import-paste-new",
@@ -617,19 +649,28 @@ if global_config.auth_type != AuthType.READ_ONLY:
 )
 def search(
     request: Request,
+    response: Response,
     term: str,
     sort: Literal["score", "title", "lastModified", "createdTime", "category", "visibility"] = "score",
     order: Literal["asc", "desc"] = "desc",
     limit: int = None,
     content_limit: int = None,
+    page: int = Query(None, ge=1),
+    view: Literal["full", "summary"] = "full",
 ):
-    """Perform a full text search on all notes."""
+    """Perform a full text search on all notes. If a page is given, the limit
+    is the page size and the total count is returned in the X-Total-Count
+    header. The summary view returns an excerpt instead of the content."""
     if sort == "lastModified":
         sort = "last_modified"
     elif sort == "createdTime":
         sort = "created_time"
     use_public_index = not is_authenticated(request)
-    return note_storage.search(term, sort=sort, order=order, limit=limit, content_limit=content_limit, use_public_index=use_public_index)
+    if page is not None:
+        results_page = note_storage.search_page(term, sort=sort, order=order, page=page, page_size=limit or DEFAULT_PAGE_SIZE, content_limit=content_limit, use_public_index=use_public_index, view=view)
+        set_page_headers(response, results_page)
+        return results_page.items
+    return note_storage.search(term, sort=sort, order=order, limit=limit, content_limit=content_limit, use_public_index=use_public_index, view=view)
 
 
 @router.get(
@@ -646,8 +687,7 @@ def get_tags(request: Request):
         all_tags = note_storage.get_tags(use_public_index=use_public_index)
         
         # Check if there are any notes without tags
-        all_notes = note_storage.list_notes(limit=None, use_public_index=use_public_index)
-        has_notes_without_tags = any(not note.tags for note in all_notes)
+        has_notes_without_tags = note_storage.has_untagged_notes(use_public_index=use_public_index)
         
         # Add "_untagged" tag if there are notes without tags
         if has_notes_without_tags and "_untagged" not in all_tags:
@@ -666,73 +706,41 @@ def get_tags_with_counts(request: Request):
         # Use public index if not authenticated, main index if authenticated
         use_public_index = not is_authenticated(request)
         
-        # Get all notes to calculate tag counts
-        all_notes = note_storage.list_notes(limit=None, use_public_index=use_public_index)
-        tag_counts = {}
-        tag_notes = {}
-        tag_recent_modified = {}  # Track most recent modified time for each tag
-        untagged_count = 0
-        untagged_notes = []
-        untagged_recent_modified = None
-        
-        # Count notes for each tag and collect note titles (max 5 per tag)
-        for note in all_notes:
-            if note.tags:
-                for tag in note.tags:
-                    if tag not in tag_counts:
-                        tag_counts[tag] = 0
-                        tag_notes[tag] = []
-                        tag_recent_modified[tag] = None
-                    tag_counts[tag] += 1
-                    # Only collect up to 5 note titles per tag
-                    if len(tag_notes[tag]) < 5:
-                        tag_notes[tag].append(note.title)
-                    # Track most recent modified time
-                    if tag_recent_modified[tag] is None or note.last_modified > tag_recent_modified[tag]:
-                        tag_recent_modified[tag] = note.last_modified
-            else:
-                # Count notes without tags as "_untagged"
-                untagged_count += 1
-                if len(untagged_notes) < 5:
-                    untagged_notes.append(note.title)
-                # Track most recent modified time for untagged
-                if untagged_recent_modified is None or note.last_modified > untagged_recent_modified:
-                    untagged_recent_modified = note.last_modified
-        
-        # Get all tags and add counts, but only include tags with count > 0
-        all_tags = note_storage.get_tags(use_public_index=use_public_index)
+        # Tag counts, recent note titles and modification times from the index
+        tag_stats = note_storage.get_tag_stats(use_public_index=use_public_index)
         
         # Get tag configurations
         tags_config = tag_storage.get_all_tags_config()
         
         result = []
         
-        for tag in all_tags:
-            count = tag_counts.get(tag, 0)
-            if count > 0:  # Only include tags that have at least one note
-                # Get tag configuration or use default
-                tag_config = tags_config.tags.get(tag, TagConfig())
-                
-                result.append({
-                    "tag": tag,
-                    "count": count,
-                    "priority": tag_config.priority,
-                    "description": tag_config.description,
-                    "is_pinned": tag_config.is_pinned,
-                    "notes": tag_notes.get(tag, []),
-                    "recentModified": tag_recent_modified.get(tag)
-                })
+        for tag, stats in tag_stats.items():
+            if tag == "_untagged":
+                continue
+            # Get tag configuration or use default
+            tag_config = tags_config.tags.get(tag, TagConfig())
+            
+            result.append({
+                "tag": tag,
+                "count": stats["count"],
+                "priority": tag_config.priority,
+                "description": tag_config.description,
+                "is_pinned": tag_config.is_pinned,
+                "notes": stats["notes"],
+                "recentModified": stats["recent_modified"]
+            })
         
         # Add _untagged tag if there are notes without tags
-        if untagged_count > 0:
+        untagged_stats = tag_stats.get("_untagged")
+        if untagged_stats:
             result.append({
                 "tag": "_untagged",
-                "count": untagged_count,
+                "count": untagged_stats["count"],
                 "priority": 1,  # Low priority for untagged
                 "description": "Notes without tags",
                 "is_pinned": False,  # _untagged cannot be pinned
-                "notes": untagged_notes,
-                "recentModified": untagged_recent_modified
+                "notes": untagged_stats["notes"],
+                "recentModified": untagged_stats["recent_modified"]
             })
         
         return result
@@ -743,21 +751,28 @@ def get_tags_with_counts(request: Request):
 
 @router.get(
     "/api/tags/{tag_name}/notes",
-    response_model=List[Note],
+    response_model=Union[List[Note], List[NoteSummary]],
 )
 def get_notes_by_tag(
     request: Request,
+    response: Response,
     tag_name: str,
     sort: Literal["title", "lastModified", "createdTime", "category", "visibility"] = "lastModified",
     order: Literal["asc", "desc"] = "desc",
     limit: int = 10,
+    page: int = Query(None, ge=1),
+    view: Literal["full", "summary"] = "full",
 ):
     if sort == "lastModified":
         sort = "last_modified"
     elif sort == "createdTime":
         sort = "created_time"
     use_public_index = not is_authenticated(request)
-    return note_storage.get_notes_by_tag(tag_name, sort=sort, order=order, limit=limit, use_public_index=use_public_index)
+    if page is not None:
+        notes_page = note_storage.get_notes_by_tag_page(tag_name, sort=sort, order=order, page=page, page_size=limit or DEFAULT_PAGE_SIZE, use_public_index=use_public_index, view=view)
+        set_page_headers(response, notes_page)
+        return notes_page.items
+    return note_storage.get_notes_by_tag(tag_name, sort=sort, order=order, limit=limit, use_public_index=use_public_index, view=view)
 
 
 if global_config.auth_type != AuthType.READ_ONLY:
@@ -777,16 +792,10 @@ if global_config.auth_type != AuthType.READ_ONLY:
             if tag_name == "_untagged":
                 raise HTTPException(status_code=400, detail="Cannot rename _untagged tag")
             
-            # Get all notes that have this tag
-            notes_with_tag = note_storage.get_notes_by_tag(tag_name, limit=None)
-            
-            # Update each note to replace the old tag with the new one
-            for note in notes_with_tag:
-                if note.tags and tag_name in note.tags:
-                    new_tags = [new_name if tag == tag_name else tag for tag in note.tags]
-                    note_storage.update(note.filename, NoteUpdate(tags=new_tags))
+            # Rewrite every note with this tag in a single batch
+            count = note_storage.rename_tag(tag_name, new_name)
             
-            return {"message": f"Tag '{tag_name}' renamed to '{new_name}' successfully"}
+            return {"message": f"Tag '{tag_name}' renamed to '{new_name}' successfully", "count": count}
         except HTTPException:
             raise
         except Exception as e:
@@ -804,16 +813,10 @@ if global_config.auth_type != AuthType.READ_ONLY:
             if tag_name == "_untagged":
                 raise HTTPException(status_code=400, detail="Cannot delete _untagged tag")
             
-            # Get all notes that have this tag
-            notes_with_tag = note_storage.get_notes_by_tag(tag_name, limit=None)
+            # Rewrite every note with this tag in a single batch
+            count = note_storage.delete_tag(tag_name)
             
-            # Update each note to remove the tag
-            for note in notes_with_tag:
-                if note.tags and tag_name in note.tags:
-                    new_tags = [tag for tag in note.tags if tag != tag_name]
-                    note_storage.update(note.filename, NoteUpdate(tags=new_tags))
-            
-            return {"message": f"Tag '{tag_name}' deleted successfully"}
+            return {"message": f"Tag '{tag_name}' deleted successfully", "count": count}
         except HTTPException:
             raise
         except Exception as e:
@@ -928,13 +931,19 @@ def restore_tags_backup(backup_filename: str, request: Request):
 
 @router.post("/api/rebuild-index", dependencies=auth_deps)
 def rebuild_index():
-    """Rebuild both search indexes (main and public) completely."""
+    """Rebuild the search index completely."""
     try:
         note_storage._sync_index_with_retry(clean=True, optimize=True)
-        return {"message": "Both indexes (main and public) rebuilt successfully"}
+        return {"message": "Index rebuilt successfully"}
     except Exception as e:
-        logger.error(f"Failed to rebuild indexes: {e}")
-        raise HTTPException(500, "Failed to rebuild indexes")
+        logger.error(f"Failed to rebuild index: {e}")
+        raise HTTPException(500, "Failed to rebuild index")
+
+@router.get("/api/stats", dependencies=auth_deps)
+def get_stats():
+    """Get index and cache statistics for tuning."""
+    return {**note_storage.get_stats(), "ccdata_cache": ccdata_cache.stats()}
+
 
 # Git history endpoints
 @router.get("/api/notes/{filename}/history")
@@ -966,6 +975,28 @@ async def get_note_version(filename: str, commit_hash: str, request: Request):
         logger.error(f"Failed to get note version: {e}")
         raise HTTPException(500, "Failed to get version")
 
+@router.get("/api/notes/{filename}/diff")
+async def get_note_diff(
+    filename: str,
+    request: Request,
+    from_commit: str = Query(..., alias="from"),
+    to_commit: str = Query(None, alias="to"),
+    mode: Literal["unified", "word"] = "unified",
+):
+    """Get the diff between two versions of a note. Without `to`, the diff is
+    against the latest version."""
+    if not is_authenticated(request):
+        raise HTTPException(401, "Authentication required")
+    
+    try:
+        diff = await note_storage.get_version_diff(filename, from_commit, to_commit, mode)
+    except Exception as e:
+        logger.error(f"Failed to get note diff: {e}")
+        raise HTTPException(500, "Failed to get diff")
+    if diff is None:
+        raise HTTPException(404, "Version not found")
+    return {"from": from_commit, "to": to_commit, "mode": mode, "diff": diff}
+
 @router.post("/api/notes/{filename}/restore")
 async def restore_note_version(filename: str, request: Request, data: dict):
     """Restore note to specific version."""
@@ -1074,68 +1105,109 @@ def get_attachment_by_directory(basename: str, filename: str):
 
 
 @router.get("/api/ccget/{basename}")
-def ccget_data(basename: str, attributes: str = Query(..., description="Comma-separated list of cclib attributes")):
+def ccget_data(
+    basename: str,
+    attributes: str = Query(..., description="Comma-separated list of cclib attributes"),
+    format: Literal["json", "binary", "npy"] = Query("json", description="Response format"),
+    frames: Optional[str] = Query(None, description="Frame index or start:stop:step slice of per-geometry attributes"),
+    atoms: Optional[str] = Query(None, description="Comma-separated atom indices or ranges such as 0,2,5-9"),
+):
     """
-    Get cclib data attributes from pickle file.
+    Get cclib data attributes of a parsed output.
     Mimics the cclib ccget command line tool.
+
+    With format=binary, arrays are sent as raw little-endian buffers after a
+    JSON header describing their dtype, shape and offset (see
+    `binary_response()`). With format=npy, a single array attribute is sent
+    as its .npy file.
+
+    `frames` and `atoms` select part of the trajectory and per-atom
+    attributes such as atomcoords, so that e.g. frames=-1 sends only the last
+    geometry. The selection is applied to the stored arrays before they are
+    read.
     """
     try:
-        import pickle
         import os
-        import numpy as np
-        
-        # Construct pickle file path
-        pkl_path = os.path.join(attachment_storage.storage_path, basename, "output.pkl")
+        from fastapi.responses import FileResponse, StreamingResponse
+        from notes.file_system.ccdata import (
+            binary_response,
+            open_ccdata,
+            parse_atoms,
+            parse_frames,
+            slice_attribute,
+            to_json_serializable,
+        )
         
-        # Check if pickle file exists
-        if not os.path.exists(pkl_path):
+        # Open the parsed data, only its manifest is read here
+        output_dir = os.path.join(attachment_storage.storage_path, basename)
+        data = open_ccdata(output_dir, ccdata_cache)
+        if data is None:
             raise HTTPException(
-                status_code=404, detail=f"Pickle file not found for basename: {basename}"
+                status_code=404, detail=f"Parsed data not found for basename: {basename}"
             )
         
-        # Load pickle data
-        with open(pkl_path, 'rb') as f:
-            data = pickle.load(f)
-        
         # Parse attributes
         attr_list = [attr.strip() for attr in attributes.split(',')]
+        try:
+            frame_slice = parse_frames(frames) if frames else None
+            atom_indices = parse_atoms(atoms) if atoms else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if format == "npy":
+            array_path = data.array_path(attr_list[0]) if len(attr_list) == 1 else None
+            if array_path is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="The npy format requires a single array attribute.",
+                )
+            if frame_slice is not None or atom_indices is not None:
+                import io
+                import numpy as np
+
+                try:
+                    value = slice_attribute(attr_list[0], data.get(attr_list[0]), frame_slice, atom_indices)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                buffer = io.BytesIO()
+                np.save(buffer, np.ascontiguousarray(value), allow_pickle=False)
+                return Response(
+                    buffer.getvalue(),
+                    media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{attr_list[0]}.npy"'},
+                )
+            return FileResponse(
+                array_path,
+                media_type="application/octet-stream",
+                filename=f"{attr_list[0]}.npy",
+            )
         
-        # Helper function to convert cclib data to JSON-serializable format
-        def convert_to_json_serializable(obj):
-            """Convert cclib data objects to JSON-serializable format"""
-            if obj is None:
-                return None
-            elif isinstance(obj, (str, int, float, bool)):
-                return obj
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, list):
-                return [convert_to_json_serializable(item) for item in obj]
-            elif isinstance(obj, dict):
-                return {key: convert_to_json_serializable(value) for key, value in obj.items()}
-            elif hasattr(obj, '__dict__'):
-                # For objects with __dict__, try to convert their attributes
-                return {key: convert_to_json_serializable(value) for key, value in obj.__dict__.items()}
-            else:
-                # For other objects, convert to string
-                return str(obj)
-        
-        # Get data for each attribute
+        # Get data for each attribute, reading only the requested arrays
         result = {}
         for attr in attr_list:
             if attr == 'xyz':
-                # Special handling for xyz format
-                if hasattr(data, 'writexyz'):
-                    result[attr] = data.writexyz()
+                # Final coordinates written by cclib when the output was parsed
+                xyz_path = os.path.join(output_dir, "output.xyz")
+                if os.path.exists(xyz_path):
+                    with open(xyz_path, 'r') as f:
+                        result[attr] = f.read()
                 else:
                     result[attr] = None
-            elif hasattr(data, attr):
-                value = getattr(data, attr)
-                result[attr] = convert_to_json_serializable(value)
             else:
-                result[attr] = None
+                try:
+                    result[attr] = slice_attribute(attr, data.get(attr), frame_slice, atom_indices)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
+        if format == "binary":
+            length, content = binary_response(result)
+            return StreamingResponse(
+                content,
+                media_type="application/octet-stream",
+                headers={"Content-Length": str(length)},
+            )
         
-        return result
+        return {attr: to_json_serializable(value) for attr, value in result.items()}
         
     except HTTPException:
         raise
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Literal, List, Optional
+from typing import Literal, List, Optional, Union
 
-from .models import Note, NoteCreate, NoteUpdate, NoteImport, NoteImageImport, NoteXyzImport, NotePlaintextImport, NotePasteImport, SearchResult
+from .models import DEFAULT_PAGE_SIZE, Note, NoteCreate, NoteUpdate, NoteImport, NoteImageImport, NoteXyzImport, NotePlaintextImport, NotePasteImport, NoteSummary, Page, SearchResult
 
 
 class BaseNotes(ABC):
@@ -55,6 +55,16 @@ class BaseNotes(ABC):
         """Delete a specific note.""" ""
         pass
 
+    @abstractmethod
+    def rename_tag(self, tag_name: str, new_name: str) -> int:
+        """Rename a tag across all notes."""
+        pass
+
+    @abstractmethod
+    def delete_tag(self, tag_name: str) -> int:
+        """Remove a tag from all notes."""
+        pass
+
     # Git history methods
     async def get_history(self, filename: str) -> List[dict]:
         """Get note history."""
@@ -64,10 +74,24 @@ class BaseNotes(ABC):
         """Get content of specific version."""
         pass
 
+    async def get_version_diff(
+        self, filename: str, from_commit: str, to_commit: Optional[str] = None, mode: str = "unified"
+    ) -> Optional[str]:
+        """Get the diff between two versions of a note."""
+        pass
+
     async def restore_version(self, filename: str, commit_hash: str) -> bool:
         """Restore note to specific version."""
         pass
 
+    def get_output_parse_status(self, filename: str) -> Optional[dict]:
+        """Get the status of parsing the output of an output note."""
+        return None
+
+    def get_stats(self) -> dict:
+        """Get index and cache statistics for tuning."""
+        return {}
+
     @abstractmethod
     def search(
         self,
@@ -76,15 +100,42 @@ class BaseNotes(ABC):
         order: Literal["asc", "desc"] = "desc",
         limit: int = None,
         content_limit: int = None,
+        view: Literal["full", "summary"] = "full",
     ) -> list[SearchResult]:
         """Search for notes."""
         pass
 
+    @abstractmethod
+    def search_page(
+        self,
+        term: str,
+        sort: Literal["score", "title", "last_modified", "created_time", "category", "visibility"] = "score",
+        order: Literal["asc", "desc"] = "desc",
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        content_limit: int = None,
+        use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
+    ) -> Page[SearchResult]:
+        """Get one page of search results with the total number of matches."""
+        pass
+
     @abstractmethod
     def get_tags(self) -> list[str]:
         """Get a list of all indexed tags."""
         pass
 
+    @abstractmethod
+    def has_untagged_notes(self, use_public_index: bool = False) -> bool:
+        """Return whether any note has no tags."""
+        pass
+
+    @abstractmethod
+    def get_tag_stats(self, use_public_index: bool = False) -> dict[str, dict]:
+        """Get the note count, recent note titles and most recent modification
+        time for each tag."""
+        pass
+
     @abstractmethod
     def list_notes(
         self,
@@ -92,10 +143,24 @@ class BaseNotes(ABC):
         order: Literal["asc", "desc"] = "desc",
         limit: int = None,
         use_public_index: bool = False,
-    ) -> list[Note]:
+        view: Literal["full", "summary"] = "full",
+    ) -> list[Union[Note, NoteSummary]]:
         """Get a list of all notes."""
         pass
 
+    @abstractmethod
+    def list_notes_page(
+        self,
+        sort: Literal["title", "last_modified", "created_time", "category", "visibility"] = "last_modified",
+        order: Literal["asc", "desc"] = "desc",
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
+    ) -> Page[Union[Note, NoteSummary]]:
+        """Get one page of all notes with the total number of notes."""
+        pass
+
     @abstractmethod
     def get_notes_by_tag(
         self,
@@ -104,10 +169,26 @@ class BaseNotes(ABC):
         order: Literal["asc", "desc"] = "desc",
         limit: int = None,
         use_public_index: bool = False,
-    ) -> list[Note]:
+        view: Literal["full", "summary"] = "full",
+    ) -> list[Union[Note, NoteSummary]]:
         """Get notes that have a specific tag."""
         pass
 
+    @abstractmethod
+    def get_notes_by_tag_page(
+        self,
+        tag_name: str,
+        sort: Literal["title", "last_modified", "created_time", "category", "visibility"] = "last_modified",
+        order: Literal["asc", "desc"] = "desc",
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
+    ) -> Page[Union[Note, NoteSummary]]:
+        """Get one page of the notes that have a specific tag with the total
+        number of such notes."""
+        pass
+
     @abstractmethod
     def get_notes_without_tags(
         self,
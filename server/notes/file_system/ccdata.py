@@ -0,0 +1,325 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from helpers import LRUCache
+from logger import logger
+
+CCDATA_DIR = "output.ccdata"
+CCDATA_MANIFEST = "manifest.json"
+CCDATA_VERSION = 1
+LEGACY_PICKLE = "output.pkl"
+# Arrays in binary responses start at multiples of this, so that clients can
+# view them in place as typed arrays
+BINARY_ALIGNMENT = 8
+BINARY_CHUNK_SIZE = 1024 * 1024
+# Attributes with one entry per geometry, and the axis of those with one
+# entry per atom, which ccget can slice
+FRAME_ATTRIBUTES = {
+    "atomcoords", "grads", "scfenergies", "mpenergies", "ccenergies",
+    "geovalues", "optstatus", "scfvalues", "time",
+}
+ATOM_AXES = {"atomcoords": 1, "grads": 1, "atomnos": 0, "atommasses": 0, "coreelectrons": 0}
+# Approximate size counted for values kept in the manifest
+MANIFEST_VALUE_SIZE = 64
+_MISSING = object()
+
+
+def to_json_serializable(obj):
+    """Convert cclib data objects to JSON-serializable format"""
+    if obj is None:
+        return None
+    elif isinstance(obj, (str, int, float, bool)):
+        return obj
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, (list, tuple)):
+        return [to_json_serializable(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {str(key): to_json_serializable(value) for key, value in obj.items()}
+    elif hasattr(obj, '__dict__'):
+        # For objects with __dict__, try to convert their attributes
+        return {key: to_json_serializable(value) for key, value in obj.__dict__.items()}
+    else:
+        # For other objects, convert to string
+        return str(obj)
+
+
+def _nbytes(value) -> int:
+    """Return the approximate memory used by a decoded attribute."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, list):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    return MANIFEST_VALUE_SIZE
+
+
+def _contains_array(value) -> bool:
+    if isinstance(value, np.ndarray):
+        return True
+    if isinstance(value, (list, tuple)):
+        return any(_contains_array(item) for item in value)
+    if isinstance(value, dict):
+        return any(_contains_array(item) for item in value.values())
+    return False
+
+
+def save_ccdata(data_obj, directory: str) -> None:
+    """Save the attributes of a parsed cclib data object to the given
+    directory, one .npy file per array plus a JSON manifest describing every
+    attribute. Scalars and other small values are kept in the manifest.
+
+    The directory is written under a temporary name and moved into place, so
+    readers never see a partial store."""
+    tmp_directory = tempfile.mkdtemp(
+        prefix=os.path.basename(directory) + ".", dir=os.path.dirname(directory)
+    )
+    files: List[str] = []
+
+    def encode(value, name: str) -> dict:
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            filename = f"{name}.npy" if not files else f"{name}.{len(files)}.npy"
+            np.save(os.path.join(tmp_directory, filename), np.ascontiguousarray(value), allow_pickle=False)
+            files.append(filename)
+            return {"array": filename, "dtype": value.dtype.str, "shape": list(value.shape)}
+        if not _contains_array(value):
+            return {"value": to_json_serializable(value)}
+        if isinstance(value, dict):
+            return {"dict": {str(key): encode(item, name) for key, item in value.items()}}
+        # Lists, tuples and ragged (object) arrays of arrays
+        return {"list": [encode(item, name) for item in value]}
+
+    attributes = {}
+    for name, value in data_obj.getattributes(tolists=False).items():
+        files.clear()
+        attributes[name] = encode(value, name)
+
+    with open(os.path.join(tmp_directory, CCDATA_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"version": CCDATA_VERSION, "attributes": attributes}, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        # Another writer saved the same data first
+        if not os.path.exists(os.path.join(directory, CCDATA_MANIFEST)):
+            raise
+
+
+class CCDataStore:
+    """Read-only access to parsed cclib data saved by `save_ccdata()`.
+
+    Only the manifest is read when the store is opened. Arrays are memory
+    mapped when an attribute is requested, so reading one attribute never
+    loads the others and large arrays are paged in only as they are used.
+
+    With a `cache`, decoded attributes are kept in it under `cache_key` plus
+    the attribute name."""
+
+    def __init__(self, directory: str, cache: Optional[LRUCache] = None, cache_key: tuple = ()):
+        self.directory = directory
+        self._cache = cache
+        self._cache_key = cache_key
+        manifest_path = os.path.join(directory, CCDATA_MANIFEST)
+        self.manifest_size = os.path.getsize(manifest_path)
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CCDATA_VERSION:
+            raise ValueError(f"Unsupported cclib data version: {manifest.get('version')}")
+        self._attributes: Dict[str, dict] = manifest["attributes"]
+
+    def attributes(self) -> List[str]:
+        """Return the names of the parsed attributes."""
+        return list(self._attributes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._attributes
+
+    def get(self, name: str, default=None) -> Any:
+        """Return the value of the given attribute, with arrays memory
+        mapped, or `default` if it was not parsed."""
+        spec = self._attributes.get(name)
+        if spec is None:
+            return default
+        if self._cache is None:
+            return self._decode(spec)
+        key = self._cache_key + (name,)
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._decode(spec)
+            self._cache.put(key, value, _nbytes(value))
+        return value
+
+    def array_path(self, name: str) -> Optional[str]:
+        """Return the path of the .npy file holding the given attribute, or
+        None if it is not stored as a single array."""
+        spec = self._attributes.get(name)
+        if spec is None or "array" not in spec:
+            return None
+        return os.path.join(self.directory, spec["array"])
+
+    def _decode(self, spec: dict) -> Any:
+        if "array" in spec:
+            return np.load(
+                os.path.join(self.directory, spec["array"]),
+                mmap_mode="r",
+                allow_pickle=False,
+            )
+        if "dict" in spec:
+            return {key: self._decode(item) for key, item in spec["dict"].items()}
+        if "list" in spec:
+            return [self._decode(item) for item in spec["list"]]
+        return spec["value"]
+
+
+def open_ccdata(output_dir: str, cache: Optional[LRUCache] = None) -> Optional[CCDataStore]:
+    """Open the parsed cclib data in the given attachment directory, or
+    return None if there is none. Outputs parsed before the data was stored
+    by attribute are converted from their pickle on first use. The pickle
+    is left in place, so a conversion can be redone by deleting the
+    converted data.
+
+    With a `cache`, the opened store and the attributes read from it are
+    kept in it, keyed by the directory and the modification time of its
+    manifest so that a store written again is read afresh."""
+    directory = os.path.join(output_dir, CCDATA_DIR)
+    manifest_path = os.path.join(directory, CCDATA_MANIFEST)
+    if cache is not None:
+        try:
+            key = (directory, os.stat(manifest_path).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        else:
+            store = cache.get(key)
+            if store is None:
+                store = CCDataStore(directory, cache, key)
+                cache.put(key, store, store.manifest_size)
+            return store
+    if not os.path.exists(manifest_path):
+        pickle_path = os.path.join(output_dir, LEGACY_PICKLE)
+        if not os.path.exists(pickle_path):
+            return None
+        logger.info(f"Converting {pickle_path} to {CCDATA_DIR}")
+        with open(pickle_path, "rb") as f:
+            data_obj = pickle.load(f)
+        save_ccdata(data_obj, directory)
+        if cache is not None:
+            return open_ccdata(output_dir, cache)
+    return CCDataStore(directory)
+
+
+def parse_frames(frames: str) -> slice:
+    """Parse a frame selection, either an index such as `-1` for the last
+    frame or a slice such as `0:100:10`."""
+    parts = frames.split(":")
+    if len(parts) > 3:
+        raise ValueError(f"Invalid frame selection: {frames}")
+    try:
+        values = [int(part) if part.strip() else None for part in parts]
+    except ValueError:
+        raise ValueError(f"Invalid frame selection: {frames}")
+    if len(values) == 1:
+        index = values[0]
+        if index is None:
+            raise ValueError(f"Invalid frame selection: {frames}")
+        # Keep the frame axis so that the shape does not depend on the selection
+        return slice(index, index + 1 or None)
+    if len(values) == 3 and values[2] == 0:
+        raise ValueError("Frame step cannot be zero.")
+    return slice(*values)
+
+
+def parse_atoms(atoms: str) -> List[int]:
+    """Parse an atom selection of indices and inclusive ranges such as
+    `0,2,5-9`."""
+    indices = []
+    try:
+        for part in atoms.split(","):
+            first, _, last = part.strip().partition("-")
+            if last:
+                indices.extend(range(int(first), int(last) + 1))
+            else:
+                indices.append(int(first))
+    except ValueError:
+        raise ValueError(f"Invalid atom selection: {atoms}")
+    return indices
+
+
+def slice_attribute(name: str, value: Any, frames: Optional[slice] = None, atoms: Optional[List[int]] = None) -> Any:
+    """Select the given frames and atoms of an attribute that has them.
+
+    Memory-mapped arrays are sliced in place, so only the selected part of a
+    trajectory is read from disk."""
+    if frames is not None and name in FRAME_ATTRIBUTES and isinstance(value, (np.ndarray, list)):
+        value = value[frames]
+    axis = ATOM_AXES.get(name)
+    if atoms is not None and axis is not None and isinstance(value, np.ndarray) and value.ndim > axis:
+        try:
+            value = np.take(value, atoms, axis=axis)
+        except IndexError:
+            raise ValueError(f"Atom index out of range for {name}")
+    return value
+
+
+def binary_response(values: Dict[str, Any]) -> Tuple[int, Iterator[memoryview]]:
+    """Encode the given attribute values for a binary ccget response and
+    return its length and an iterator over its contents.
+
+    The response starts with the length of a JSON header as a little-endian
+    uint32, followed by the header itself. The header holds every value with
+    each array replaced by {"$array": {"dtype", "shape", "offset", "nbytes"}}.
+    The raw little-endian contents of the arrays follow from the first
+    multiple of BINARY_ALIGNMENT bytes after the header, each aligned to
+    BINARY_ALIGNMENT bytes, with offsets counted from there. Arrays are sent
+    straight from their memory-mapped files."""
+    arrays: List[np.ndarray] = []
+    offset = 0
+
+    def describe(value):
+        nonlocal offset
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            if not value.dtype.isnative or not np.little_endian:
+                value = value.astype(value.dtype.newbyteorder("<"))
+            array = np.ascontiguousarray(value)
+            arrays.append(array)
+            descriptor = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+                "nbytes": array.nbytes,
+            }
+            offset += array.nbytes + _padding(array.nbytes)
+            return {"$array": descriptor}
+        if isinstance(value, dict):
+            return {str(key): describe(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)) and _contains_array(value):
+            return [describe(item) for item in value]
+        return to_json_serializable(value)
+
+    header = json.dumps({name: describe(value) for name, value in values.items()}).encode("utf-8")
+    prefix = len(header).to_bytes(4, "little") + header
+    prefix += b"\0" * _padding(len(prefix))
+
+    def content() -> Iterator[memoryview]:
+        yield memoryview(prefix)
+        for array in arrays:
+            data = memoryview(array.reshape(-1).view(np.uint8))
+            for i in range(0, len(data), BINARY_CHUNK_SIZE):
+                yield data[i:i + BINARY_CHUNK_SIZE]
+            if _padding(array.nbytes):
+                yield memoryview(b"\0" * _padding(array.nbytes))
+
+    return len(prefix) + offset, content()
+
+
+def _padding(nbytes: int) -> int:
+    return -nbytes % BINARY_ALIGNMENT
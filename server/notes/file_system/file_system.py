@@ -3,63 +3,48 @@ import os
 import re
 import shutil
 import string
-import time
-import asyncio
-import pickle
+import threading
+import atexit
+import concurrent.futures
 from datetime import datetime
-from typing import List, Literal, Set, Tuple, Optional
+from typing import Callable, Iterable, List, Literal, Set, Tuple, Optional, Union
 import random
 
 import whoosh
 from whoosh import writing
 from whoosh.analysis import CharsetFilter, StemmingAnalyzer, StandardAnalyzer
-from whoosh.fields import DATETIME, ID, KEYWORD, TEXT, SchemaClass
+from whoosh.fields import DATETIME, ID, KEYWORD, STORED, TEXT, SchemaClass
 from whoosh.highlight import ContextFragmenter, WholeFragmenter
-from whoosh.index import Index, LockError
-from whoosh.qparser import MultifieldParser
+from whoosh.idsets import BitSet
+from whoosh.index import Index
+from whoosh.qparser import FuzzyTermPlugin, MultifieldParser, WildcardPlugin
 from whoosh.qparser.dateparse import DateParserPlugin
-from whoosh.query import Every
+from whoosh.query import Every, Not, Query, Term
 from whoosh.searching import Hit
 from whoosh.support.charset import accent_map
 
-# Try to import cclib, but don't fail if it's not available
-try:
-    import cclib
-    CCLIB_AVAILABLE = True
-except ImportError:
-    CCLIB_AVAILABLE = False
-
-def _create_xyz_file(data_obj, xyz_file_path):
-    """Create xyz file from cclib data object using writexyz() method."""
-    try:
-        # Check if writexyz method is available
-        if not hasattr(data_obj, 'writexyz'):
-            logger.warning("writexyz method not available in cclib data object")
-            return False
-        
-        # Generate xyz content using cclib's writexyz method
-        # This will use the last (final) coordinate set by default
-        xyz_content = data_obj.writexyz()
-        
-        # Write xyz file
-        with open(xyz_file_path, 'w') as f:
-            f.write(xyz_content)
-        
-        return True
-        
-    except Exception as e:
-        logger.warning(f"Failed to create xyz file: {str(e)}")
-        return False
-
-from helpers import get_env, parse_markdown_with_frontmatter, create_markdown_with_frontmatter
+from helpers import LRUCache, get_env, parse_markdown_with_frontmatter, create_markdown_with_frontmatter
 from logger import logger
 
 from ..base import BaseNotes
-from ..models import Note, NoteCreate, NoteUpdate, NoteImport, NoteImageImport, NoteXyzImport, NotePlaintextImport, NotePasteImport, SearchResult
+from ..models import DEFAULT_PAGE_SIZE, Note, NoteCreate, NoteUpdate, NoteImport, NoteImageImport, NoteXyzImport, NotePlaintextImport, NotePasteImport, NoteSummary, Page, SearchResult
 from ..git_history import GitHistoryManager
+from .index_writer import IndexWriteQueue
+from .manifest import SyncManifest
+from .output_parser import CCLIB_AVAILABLE, OutputParseQueue
+from .searcher_pool import SearcherPool
+from .tag_stats import UNTAGGED, TagStats
+from .watcher import NotesWatcher
 
 MARKDOWN_EXT = ".md"
-INDEX_SCHEMA_VERSION = "10"
+INDEX_SCHEMA_VERSION = "12"
+EXCERPT_LENGTH = 200
+SYNC_TIMEOUT = 30
+DATE_FIELDS = ("last_modified", "created_time")
+SORT_FIELDS = ("title", "last_modified", "created_time", "category", "visibility")
+TAG_RECENT_NOTES = 5
+BULK_PROGRESS_INTERVAL = 100
+OUTPUT_PARSING_MESSAGE = "⏳ Parsing with cclib..."
 
 # Use StandardAnalyzer for more flexible matching
 StemmingFoldingAnalyzer = StandardAnalyzer() | CharsetFilter(accent_map)
@@ -72,17 +57,30 @@ def generate_random_filename(length: int = 8) -> str:
 
 
 class IndexSchema(SchemaClass):
+    # All note metadata is stored so that listings can be served from the
+    # index without reading the markdown files
     filename = ID(unique=True, stored=True)
     last_modified = DATETIME(stored=True, sortable=True)
     created_time = DATETIME(stored=True, sortable=True)
     title = TEXT(
-        field_boost=2.0, analyzer=StemmingFoldingAnalyzer, sortable=True
+        field_boost=2.0,
+        analyzer=StemmingFoldingAnalyzer,
+        sortable=True,
+        stored=True,
     )
-    content = TEXT(analyzer=StemmingFoldingAnalyzer)
+    content = TEXT(analyzer=StemmingFoldingAnalyzer, stored=True)
+    excerpt = STORED
     tags = KEYWORD(lowercase=False, field_boost=2.0)
-    category = KEYWORD(lowercase=False, field_boost=1.5)
-    visibility = KEYWORD(lowercase=False, field_boost=1.5)
-    attachment_extension = KEYWORD(lowercase=False, field_boost=1.0)
+    tag_list = STORED
+    category = KEYWORD(
+        lowercase=False, field_boost=1.5, stored=True, sortable=True
+    )
+    visibility = KEYWORD(
+        lowercase=False, field_boost=1.5, stored=True, sortable=True
+    )
+    attachment_extension = KEYWORD(
+        lowercase=False, field_boost=1.0, stored=True
+    )
 
 
 class FileSystemNotes(BaseNotes):
@@ -103,14 +101,93 @@ class FileSystemNotes(BaseNotes):
         os.makedirs(self.storage_path, exist_ok=True)
         
         # Initialize Git history manager
-        self.git_manager = GitHistoryManager(self.base_path)
+        self.git_manager = GitHistoryManager(
+            self.base_path,
+            commit_window=float(get_env("SBNOTE_GIT_COMMIT_WINDOW", default="5")),
+            maintenance_interval=float(get_env("SBNOTE_GIT_MAINTENANCE_INTERVAL", default="3600")),
+            max_concurrency=get_env("SBNOTE_GIT_MAX_CONCURRENCY", default=4, cast_int=True),
+            timeout=float(get_env("SBNOTE_GIT_TIMEOUT", default="30")),
+            version_cache_size=get_env("SBNOTE_GIT_VERSION_CACHE_SIZE", default=256, cast_int=True),
+            diff_cache_size=get_env("SBNOTE_GIT_DIFF_CACHE_SIZE", default=128, cast_int=True),
+            compaction_interval=float(get_env("SBNOTE_GIT_COMPACTION_INTERVAL", default="86400")),
+        )
         self.git_manager._initialize_git_repository()
-        
-        # Initialize both indexes
-        self.main_index = self._load_index("main")
-        self.public_index = self._load_index("public")
-        logger.info("Initializing indexes...")
-        self._sync_index_with_retry(optimize=True, clean=True)
+        atexit.register(self.git_manager.stop)
+        
+        # Initialize the index. Anonymous requests are served from the same
+        # index through a cached mask of non-public notes.
+        self.main_index = self._load_index()
+        self.searchers = SearcherPool(self.main_index)
+        self.search_cache = LRUCache(
+            get_env("SBNOTE_SEARCH_CACHE_SIZE", default=256, cast_int=True)
+        )
+        self._search_cache_generation = None
+        self.query_cache = LRUCache(
+            get_env("SBNOTE_QUERY_CACHE_SIZE", default=512, cast_int=True)
+        )
+        self._parsers = {}
+        self._parsers_lock = threading.Lock()
+        self.bulk_workers = get_env("SBNOTE_BULK_WORKERS", default=8, cast_int=True)
+        self.output_parser = OutputParseQueue(
+            workers=get_env("SBNOTE_PARSE_WORKERS", default=2, cast_int=True),
+            max_jobs=get_env("SBNOTE_PARSE_QUEUE_SIZE", default=16, cast_int=True),
+        )
+        atexit.register(self.output_parser.stop)
+        self._private_docs_cache: Optional[Tuple[int, BitSet]] = None
+        self._private_docs_lock = threading.Lock()
+        if os.path.exists(self._public_index_path):
+            logger.info("Deleting obsolete public index")
+            shutil.rmtree(self._public_index_path, ignore_errors=True)
+
+        # Start watching before the initial sync so that no change is missed
+        self.watcher = NotesWatcher(
+            self.storage_path,
+            MARKDOWN_EXT,
+            mode=get_env("SBNOTE_WATCH_MODE", default="auto").lower(),
+            poll_interval=float(get_env("SBNOTE_WATCH_POLL_INTERVAL", default="2")),
+        )
+        self.watcher.start()
+        self._sync_lock = threading.Lock()
+
+        # Only reindex the notes that changed since the last run unless a
+        # clean start is requested or the manifest cannot be trusted
+        self.manifest = SyncManifest(os.path.join(self._index_path, "manifest.json"))
+        atexit.register(self.manifest.save, force=True)
+
+        # Tag counts and recent notes for the tag dashboard, kept up to date
+        # by the index writer
+        self.tag_stats = TagStats(
+            os.path.join(self._index_path, "tag_stats.json"),
+            recent_notes=TAG_RECENT_NOTES,
+        )
+        atexit.register(self.tag_stats.save, force=True)
+
+        # All writes to the index go through a single background writer
+        self.index_writer = IndexWriteQueue(
+            self._sync_files,
+            lambda optimize, clean: self._sync_index(optimize=optimize, clean=clean),
+            commit_delay=float(get_env("SBNOTE_INDEX_COMMIT_DELAY", default="0.05")),
+        )
+        self.index_writer.start()
+        atexit.register(self.index_writer.stop)
+
+        clean_start = get_env("SBNOTE_INDEX_CLEAN_START", default=False, cast_bool=True)
+        generation = self.main_index.latest_generation()
+        manifest_loaded = self.manifest.load(INDEX_SCHEMA_VERSION, generation)
+        tag_stats_loaded = self.tag_stats.load(INDEX_SCHEMA_VERSION, generation)
+        if not clean_start and manifest_loaded:
+            if not tag_stats_loaded:
+                self._rebuild_tag_stats()
+            changed = self.manifest.changed_files(self.storage_path, MARKDOWN_EXT)
+            logger.info(f"Syncing index ({len(changed)} notes changed since last run)...")
+            self.index_writer.wait_for_generation(self.index_writer.submit(changed))
+        else:
+            # Without a trusted manifest every note is compared with the
+            # index, which is only cleared when a clean start is requested
+            logger.info("Initializing index...")
+            self._sync_index_with_retry(optimize=True, clean=clean_start)
+        self.manifest.save(force=True)
+        self.tag_stats.save(force=True)
         logger.info("Index initialization completed")
 
     def create(self, data: NoteCreate) -> Note:
@@ -136,23 +213,10 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([filename + MARKDOWN_EXT])
         
-        # Git commit (non-blocking)
-        try:
-            # 同期的なコンテキストで非同期処理を実行
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # イベントループが実行中の場合は、バックグラウンドタスクとして実行
-                loop.create_task(self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data))
-            else:
-                # イベントループが実行されていない場合は、新しいループで実行
-                asyncio.run(self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data))
-        except RuntimeError:
-            # イベントループが取得できない場合は、スレッドプールで実行
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                executor.submit(asyncio.run, self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data))
+        # Git commit (scheduled, non-blocking)
+        self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data)
         
         return Note(
             title=data.title,
@@ -204,23 +268,10 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([filename + MARKDOWN_EXT])
         
-        # Git commit (non-blocking)
-        try:
-            # 同期的なコンテキストで非同期処理を実行
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # イベントループが実行中の場合は、バックグラウンドタスクとして実行
-                loop.create_task(self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data))
-            else:
-                # イベントループが実行されていない場合は、新しいループで実行
-                asyncio.run(self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data))
-        except RuntimeError:
-            # イベントループが取得できない場合は、スレッドプールで実行
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                executor.submit(asyncio.run, self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data))
+        # Git commit (scheduled, non-blocking)
+        self.git_manager.commit_note_change(filename + MARKDOWN_EXT, data)
         
         return Note(
             title=title,
@@ -271,7 +322,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -323,7 +374,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -375,7 +426,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -430,7 +481,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -482,7 +533,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -534,7 +585,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -572,52 +623,9 @@ class FileSystemNotes(BaseNotes):
         # Create markdown content with original filename on first line and output file link on third line
         content = f"{data.original_filename}\n\n[Output](/a/{note_filename})"
         
-        # cclib processing
+        # cclib processing runs in the background and updates the note when done
         if CCLIB_AVAILABLE:
-            try:
-                # Build file paths
-                output_file_path = os.path.join(self.base_path, "files", basename, "output.txt")
-                pickle_file_path = os.path.join(self.base_path, "files", basename, "output.pkl")
-                
-                # Check if output file exists
-                if not os.path.exists(output_file_path):
-                    raise FileNotFoundError(f"Output file not found: {output_file_path}")
-                
-                # Check if directory exists
-                output_dir = os.path.dirname(output_file_path)
-                if not os.path.exists(output_dir):
-                    raise FileNotFoundError(f"Output directory not found: {output_dir}")
-                
-                # Parse with cclib
-                parser = cclib.io.ccopen(output_file_path)
-                if parser is None:
-                    raise ValueError(f"cclib could not determine file format for: {output_file_path}")
-                
-                data_obj = parser.parse()
-                if data_obj is None:
-                    raise ValueError(f"cclib parsing failed for: {output_file_path}")
-                
-                # Save as pickle
-                with open(pickle_file_path, 'wb') as f:
-                    pickle.dump(data_obj, f)
-                
-                # Create xyz file from coordinates
-                xyz_file_path = os.path.join(self.base_path, "files", basename, "output.xyz")
-                xyz_created = _create_xyz_file(data_obj, xyz_file_path)
-                
-                # Add success message to content
-                if xyz_created:
-                    content += f"\n\n## cclib Processing\n✅ Successfully parsed and saved to `output.pkl`\n✅ Created `output.xyz` from final coordinates"
-                else:
-                    content += f"\n\n## cclib Processing\n✅ Successfully parsed and saved to `output.pkl`\n⚠️ Could not create `output.xyz` (no coordinates available)"
-                
-            except Exception as e:
-                # Add error message to content
-                error_msg = str(e)
-                content += f"\n\n## cclib Processing\n❌ Error: {error_msg}"
-                logger.warning(f"cclib processing failed for {basename}: {error_msg}")
-                logger.warning(f"Output file path: {output_file_path if 'output_file_path' in locals() else 'not defined'}")
-                logger.warning(f"Exception type: {type(e).__name__}")
+            content += f"\n\n## cclib Processing\n{OUTPUT_PARSING_MESSAGE}"
         else:
             # cclib is not available
             content += f"\n\n## cclib Processing\n⚠️ cclib library is not available"
@@ -637,7 +645,19 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
+        
+        if CCLIB_AVAILABLE:
+            output_dir = os.path.join(self.base_path, "files", basename)
+            if not self.output_parser.submit(
+                note_filename + MARKDOWN_EXT, output_dir, self._finish_output_parse
+            ):
+                self._finish_output_parse(
+                    note_filename + MARKDOWN_EXT,
+                    None,
+                    RuntimeError("Too many outputs are being parsed, please import it again later"),
+                )
+                content = self.get(note_filename + MARKDOWN_EXT).content
         
         return Note(
             title=title,
@@ -649,6 +669,35 @@ class FileSystemNotes(BaseNotes):
             attachment_extension=attachment_extension,
         )
 
+    def _finish_output_parse(
+        self, filename: str, xyz_created: Optional[bool], error: Optional[BaseException]
+    ) -> None:
+        """Replace the parsing message of an output note with the result of
+        parsing its output."""
+        if error is None:
+            if xyz_created:
+                result = f"✅ Successfully parsed and saved to `output.ccdata`\n✅ Created `output.xyz` from final coordinates"
+            else:
+                result = f"✅ Successfully parsed and saved to `output.ccdata`\n⚠️ Could not create `output.xyz` (no coordinates available)"
+        else:
+            result = f"❌ Error: {error}"
+            logger.warning(f"cclib processing failed for {filename}: {error}")
+            logger.warning(f"Exception type: {type(error).__name__}")
+        
+        note = self.get(filename)
+        if OUTPUT_PARSING_MESSAGE in note.content:
+            content = note.content.replace(OUTPUT_PARSING_MESSAGE, result, 1)
+        else:
+            # The message was edited away in the meantime
+            content = note.content + f"\n\n## cclib Processing\n{result}"
+        self.update(filename, NoteUpdate(new_content=content, tags=note.tags))
+    
+    def get_output_parse_status(self, filename: str) -> Optional[dict]:
+        """Get the status of parsing the output of an output note."""
+        if not filename.endswith(MARKDOWN_EXT):
+            filename += MARKDOWN_EXT
+        return self.output_parser.status(filename)
+
     def import_paste_new(self, data: NotePasteImport, basename: str, original_extension: str) -> Note:
         """Import a pasted text file with new directory structure."""
         # Generate title from category (capitalized)
@@ -692,7 +741,7 @@ class FileSystemNotes(BaseNotes):
         self._write_file(filepath, markdown_content)
         
         # Update the search indexes
-        self._sync_index_with_retry()
+        self._sync_pending([note_filename + MARKDOWN_EXT])
         
         return Note(
             title=title,
@@ -770,14 +819,54 @@ class FileSystemNotes(BaseNotes):
         if not filename.endswith(MARKDOWN_EXT):
             filename += MARKDOWN_EXT
         filepath = os.path.join(self.storage_path, filename)
+        metadata, body = self._write_update(filename, data)
+        
+        # Update the search indexes
+        self._sync_pending([filename])
+        
+        # Git commit (scheduled, non-blocking)
+        self.git_manager.commit_note_change(filename, data)
+        
+        # Parse created date from frontmatter
+        created_time = None
+        if 'created_time' in metadata:
+            try:
+                created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
+            except (ValueError, TypeError):
+                created_time = os.path.getctime(filepath)
+        else:
+            created_time = os.path.getctime(filepath)
+        
+        return Note(
+            title=metadata.get('title', self._strip_ext(filename)),
+            content=body,
+            last_modified=os.path.getmtime(filepath),
+            created_time=created_time,
+            tags=metadata.get('tags', []),
+            filename=filename,
+            category=metadata.get('category', 'note'),
+            visibility=metadata.get('visibility', 'private'),
+            attachment_extension=metadata.get('attachment_extension', ''),
+        )
+
+    def _write_update(
+        self,
+        filename: str,
+        data: NoteUpdate,
+        update_tags: Optional[Callable[[List[str]], Optional[List[str]]]] = None,
+    ) -> Optional[Tuple[dict, str]]:
+        """Apply the given update to a note file and return its new metadata
+        and body. The index and Git history are not updated.
+
+        `update_tags` is called with the tags currently in the file and
+        returns the new tags, or None to leave the file unchanged, in which
+        case None is returned."""
+        filepath = os.path.join(self.storage_path, filename)
         
         # Read existing content and parse frontmatter
         existing_content = self._read_file(filepath)
         metadata, body = parse_markdown_with_frontmatter(existing_content)
         
-        # Store old visibility for index update logic
-        old_visibility = metadata.get('visibility', 'private')
-        
         # Update metadata (file name stays the same, only frontmatter changes)
         if data.new_title is not None:
             metadata['title'] = data.new_title
@@ -788,6 +877,11 @@ class FileSystemNotes(BaseNotes):
         
         if data.tags is not None:
             metadata['tags'] = data.tags
+        if update_tags is not None:
+            tags = update_tags(metadata.get('tags', []))
+            if tags is None:
+                return None
+            metadata['tags'] = tags
         
         # Update visibility if provided
         if data.visibility is not None:
@@ -813,51 +907,12 @@ class FileSystemNotes(BaseNotes):
             tags=metadata.get('tags', []),
             created=created_dt,
             category=metadata.get('category', 'note'),
-            visibility=metadata.get('visibility', 'private')
+            visibility=metadata.get('visibility', 'private'),
+            attachment_extension=metadata.get('attachment_extension'),
         )
         
         self._write_file(filepath, markdown_content, overwrite=True)
-        
-        # Update the search indexes with visibility change handling
-        self._sync_index_with_retry(visibility_changed=(old_visibility != metadata.get('visibility', 'private')))
-        
-        # Git commit (non-blocking)
-        try:
-            # 同期的なコンテキストで非同期処理を実行
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # イベントループが実行中の場合は、バックグラウンドタスクとして実行
-                loop.create_task(self.git_manager.commit_note_change(filename, data))
-            else:
-                # イベントループが実行されていない場合は、新しいループで実行
-                asyncio.run(self.git_manager.commit_note_change(filename, data))
-        except RuntimeError:
-            # イベントループが取得できない場合は、スレッドプールで実行
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                executor.submit(asyncio.run, self.git_manager.commit_note_change(filename, data))
-        
-        # Parse created date from frontmatter
-        created_time = None
-        if 'created_time' in metadata:
-            try:
-                created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
-            except (ValueError, TypeError):
-                created_time = os.path.getctime(filepath)
-        else:
-            created_time = os.path.getctime(filepath)
-        
-        return Note(
-            title=metadata.get('title', self._strip_ext(filename)),
-            content=body,
-            last_modified=os.path.getmtime(filepath),
-            created_time=created_time,
-            tags=metadata.get('tags', []),
-            filename=filename,
-            category=metadata.get('category', 'note'),
-            visibility=metadata.get('visibility', 'private'),
-            attachment_extension=metadata.get('attachment_extension', ''),
-        )
+        return metadata, body
 
     def delete(self, filename: str) -> None:
         # Add extension if not present
@@ -867,7 +922,76 @@ class FileSystemNotes(BaseNotes):
         os.remove(filepath)
         
         # Update the search index
-        self._sync_index_with_retry()
+        self._sync_pending([filename])
+
+    def rename_tag(self, tag_name: str, new_name: str) -> int:
+        """Rename a tag across all notes and return the number of notes
+        changed."""
+
+        def rename(tags: List[str]) -> List[str]:
+            # Drop the duplicate if a note already has the new tag
+            return list(dict.fromkeys(new_name if tag == tag_name else tag for tag in tags))
+
+        return self._bulk_update_tags(
+            tag_name, rename, f"Rename tag '{tag_name}' to '{new_name}'"
+        )
+
+    def delete_tag(self, tag_name: str) -> int:
+        """Remove a tag from all notes and return the number of notes
+        changed."""
+        return self._bulk_update_tags(
+            tag_name,
+            lambda tags: [tag for tag in tags if tag != tag_name],
+            f"Delete tag '{tag_name}'",
+        )
+
+    def _bulk_update_tags(
+        self,
+        tag_name: str,
+        update_tags: Callable[[List[str]], List[str]],
+        description: str,
+    ) -> int:
+        """Rewrite the tags of every note with the given tag. Files are
+        rewritten in parallel, then reindexed in a single index commit and
+        recorded in a single Git commit. The new tags are computed from the
+        tags in each file, which may be newer than the index."""
+        notes = self.get_notes_by_tag(tag_name, view="summary")
+        total = len(notes)
+        if not total:
+            return 0
+
+        def rewrite(note: NoteSummary) -> Optional[str]:
+            result = self._write_update(
+                note.filename,
+                NoteUpdate(tags=None),
+                # Skip notes whose tag was removed since they were indexed
+                lambda tags: update_tags(tags) if tag_name in tags else None,
+            )
+            return None if result is None else note.filename
+
+        changed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.bulk_workers) as executor:
+            futures = [executor.submit(rewrite, note) for note in notes]
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                try:
+                    filename = future.result()
+                except Exception as e:
+                    logger.error(f"{description}: failed to update note: {e}")
+                else:
+                    if filename is not None:
+                        changed.append(filename)
+                if done % BULK_PROGRESS_INTERVAL == 0 or done == total:
+                    logger.info(f"{description}: {done}/{total} notes")
+
+        # Update the search index
+        self._sync_pending(changed)
+
+        # Git commit (scheduled, non-blocking). Not an autosave, so that
+        # history compaction keeps it
+        self.git_manager.commit_notes_change(
+            changed, f"Tags: {description} ({len(changed)} notes)"
+        )
+        return len(changed)
 
     def _pre_process_search_term(self, term: str) -> str:
         """Pre-process search terms to handle special prefixes."""
@@ -885,111 +1009,143 @@ class FileSystemNotes(BaseNotes):
         limit: int = None,
         content_limit: int = None,
         use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
     ) -> Tuple[SearchResult, ...]:
-        """Search the index for the given term."""
-        self._sync_index_with_retry()
-        
-        # Choose the appropriate index based on use_public_index parameter
-        index_to_use = self.public_index if use_public_index else self.main_index
-        
-        # Check if this is a search for "_untagged" tag
-        original_term = term.strip()
-        if original_term == "#_untagged" or original_term == "tags:_untagged":
-            # Special handling for _untagged tag - return notes without tags
-            with index_to_use.searcher() as searcher:
-                # Get all notes and filter those without tags
-                query = Every()
-                
-                # Determine sort field
-                sort_field = sort if sort in ["title", "last_modified", "created_time", "category", "visibility"] else None
-                
-                # Determine sort direction
-                reverse = order == "desc"
-                if sort_field is None:
-                    reverse = not reverse
-                
-                # Run search to get all notes
-                results = searcher.search(
-                    query,
-                    sortedby=sort_field,
-                    reverse=reverse,
-                    limit=None,  # Get all notes to filter
-                    terms=True,
-                )
-                
-                # Filter results to only include notes without tags
-                filtered_results = []
-                for hit in results:
-                    filename = hit["filename"]
-                    filepath = os.path.join(self.storage_path, filename)
-                    content = self._read_file(filepath)
-                    metadata, body = parse_markdown_with_frontmatter(content)
-                    
-                    # Only include notes without tags
-                    if not metadata.get('tags', []):
-                        filtered_results.append(hit)
-                
-                # Apply limit after filtering
-                if limit:
-                    filtered_results = filtered_results[:limit]
-                
-                return tuple(self._search_result_from_hit(hit, content_limit) for hit in filtered_results)
-        
+        """Search the index for the given term. Results are cached until the
+        index next changes. The summary view returns an excerpt instead of
+        the content."""
+        results, _ = self._cached_search(
+            term, sort, order, limit, None, content_limit, use_public_index, view
+        )
+        return results
+
+    def search_page(
+        self,
+        term: str,
+        sort: Literal["score", "title", "last_modified", "created_time", "category", "visibility"] = "score",
+        order: Literal["asc", "desc"] = "desc",
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        content_limit: int = None,
+        use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
+    ) -> Page[SearchResult]:
+        """Get one page of search results for the given term, numbered from 1,
+        along with the total number of matches."""
+        results, total = self._cached_search(
+            term, sort, order, page_size, page, content_limit, use_public_index, view
+        )
+        return Page(items=results, total=total, page=page, page_size=page_size)
+
+    def _cached_search(
+        self,
+        term: str,
+        sort: str,
+        order: str,
+        limit: Optional[int],
+        page: Optional[int],
+        content_limit: Optional[int],
+        use_public_index: bool,
+        view: str,
+    ) -> Tuple[Tuple[SearchResult, ...], Optional[int]]:
+        self._sync_pending()
+
+        # Drop every cached result once a new index generation is committed
+        generation = self.searchers.generation
+        if generation != self._search_cache_generation:
+            self.search_cache.clear()
+            self._search_cache_generation = generation
+
+        key = (
+            generation,
+            " ".join(term.split()),
+            sort,
+            order,
+            limit,
+            page,
+            content_limit,
+            use_public_index,
+            view,
+        )
+        cached = self.search_cache.get(key)
+        if cached is None:
+            cached = self._search(
+                term, sort, order, limit, page, content_limit, use_public_index, view
+            )
+            self.search_cache.put(key, cached)
+        return cached
+
+    def _search(
+        self,
+        term: str,
+        sort: str,
+        order: str,
+        limit: Optional[int],
+        page: Optional[int],
+        content_limit: Optional[int],
+        use_public_index: bool,
+        view: str,
+    ) -> Tuple[Tuple[SearchResult, ...], Optional[int]]:
+        """Search the index for the given term without caching. If `page` is
+        given, `limit` is the page size. Return the results and the total
+        number of matches (only counted when paging)."""
+        # Determine Sort By
+        # Note: For the 'sort' option, "score" is converted to None as
+        # that is the default for searches anyway and it's quicker for
+        # Whoosh if you specify None.
+        sort = sort if sort in SORT_FIELDS else None
+
+        # Determine Sort Direction
+        # Note: Confusingly, when sorting by 'score', reverse = True means
+        # asc so we have to flip the logic for that case!
+        reverse = order == "desc"
+        if sort is None:
+            reverse = not reverse
+
         # Pre-process search term
         term = self._pre_process_search_term(term)
-        
+
         # Regular search processing
-        with index_to_use.searcher() as searcher:
+        with self.searchers.searcher() as searcher:
             # Parse Query
             if term == "*":
                 query = Every()
             else:
-                parser = MultifieldParser(
-                    self._fieldnames_for_term(term), index_to_use.schema
-                )
-                parser.add_plugin(DateParserPlugin())
-                
-                # Add fuzzy search and wildcard support
-                from whoosh.qparser import FuzzyTermPlugin, WildcardPlugin
-                # Configure fuzzy search with distance 3 (allows more character differences)
-                fuzzy_plugin = FuzzyTermPlugin()
-                fuzzy_plugin.maxdist = 3
-                parser.add_plugin(fuzzy_plugin)
-                parser.add_plugin(WildcardPlugin())
-                
-                query = parser.parse(term)
-
-            # Determine Sort By
-            # Note: For the 'sort' option, "score" is converted to None as
-            # that is the default for searches anyway and it's quicker for
-            # Whoosh if you specify None.
-            sort = sort if sort in ["title", "last_modified", "created_time", "category", "visibility"] else None
-
-            # Determine Sort Direction
-            # Note: Confusingly, when sorting by 'score', reverse = True means
-            # asc so we have to flip the logic for that case!
-            reverse = order == "desc"
-            if sort is None:
-                reverse = not reverse
+                query = self._parse_query(term)
 
             # Run Search
-            results = searcher.search(
+            hits, total = self._search_hits(
+                searcher,
                 query,
+                limit,
+                page,
                 sortedby=sort,
                 reverse=reverse,
-                limit=limit,
                 terms=True,
+                mask=self._visibility_mask(searcher, use_public_index),
+            )
+            return (
+                tuple(self._search_result_from_hit(hit, content_limit, view) for hit in hits),
+                total,
             )
-            return tuple(self._search_result_from_hit(hit, content_limit) for hit in results)
 
     def get_tags(self, use_public_index: bool = False) -> list[str]:
-        """Return a list of all indexed tags. Note: Tags no longer in use will
-        only be cleared when the index is next optimized."""
-        self._sync_index_with_retry()
-        index_to_use = self.public_index if use_public_index else self.main_index
-        with index_to_use.reader() as reader:
-            tags = reader.field_terms("tags")
-            return [tag for tag in tags]
+        """Return a list of all tags in use."""
+        self._sync_pending()
+        return self.tag_stats.tags(use_public_index)
+
+    def has_untagged_notes(self, use_public_index: bool = False) -> bool:
+        """Return whether any note has no tags."""
+        self._sync_pending()
+        return self.tag_stats.has_untagged(use_public_index)
+
+    def get_tag_stats(self, use_public_index: bool = False) -> dict[str, dict]:
+        """Return the number of notes, the titles of the most recently
+        modified notes and the most recent modification time for each tag,
+        plus "_untagged" for the notes without tags. Served from the tag
+        statistics maintained by the index writer."""
+        self._sync_pending()
+        return self.tag_stats.get(use_public_index)
 
     def list_notes(
         self,
@@ -997,58 +1153,30 @@ class FileSystemNotes(BaseNotes):
         order: Literal["asc", "desc"] = "desc",
         limit: int = None,
         use_public_index: bool = False,
-    ) -> list[Note]:
-        """Get a list of all notes."""
-        self._sync_index_with_retry()
-        index_to_use = self.public_index if use_public_index else self.main_index
-        with index_to_use.searcher() as searcher:
-            # Use Every() query to get all documents
-            query = Every()
-            
-            # Determine sort field
-            sort_field = sort if sort in ["title", "last_modified", "created_time", "category", "visibility"] else "last_modified"
-            
-            # Determine sort direction
-            reverse = order == "desc"
-            
-            # Run search
-            results = searcher.search(
-                query,
-                sortedby=sort_field,
-                reverse=reverse,
-                limit=limit,
-            )
-            
-            # Convert to Note objects
-            notes = []
-            for hit in results:
-                filename = hit["filename"]
-                filepath = os.path.join(self.storage_path, filename)
-                content = self._read_file(filepath)
-                metadata, body = parse_markdown_with_frontmatter(content)
-                
-                # Parse created date from frontmatter
-                created_time = None
-                if 'created_time' in metadata:
-                    try:
-                        created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
-                    except (ValueError, TypeError):
-                        created_time = os.path.getctime(filepath)
-                else:
-                    created_time = os.path.getctime(filepath)
-                notes.append(Note(
-                    title=metadata.get('title', self._strip_ext(filename)),
-                    content=body,
-                    last_modified=hit["last_modified"].timestamp(),
-                    created_time=created_time,
-                    tags=metadata.get('tags', []),
-                    filename=filename,
-                    category=metadata.get('category', 'note'),
-                    visibility=metadata.get('visibility', 'private'),
-                    attachment_extension=metadata.get('attachment_extension', ''),
-                ))
-            
-            return notes
+        view: Literal["full", "summary"] = "full",
+    ) -> list[Union[Note, NoteSummary]]:
+        """Get a list of all notes. The summary view returns an excerpt
+        instead of the content."""
+        notes, _ = self._find_notes(
+            Every(), sort, order, limit, None, use_public_index, view=view
+        )
+        return notes
+
+    def list_notes_page(
+        self,
+        sort: Literal["title", "last_modified", "created_time", "category", "visibility"] = "last_modified",
+        order: Literal["asc", "desc"] = "desc",
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
+    ) -> Page[Union[Note, NoteSummary]]:
+        """Get one page of all notes, numbered from 1, along with the total
+        number of notes."""
+        notes, total = self._find_notes(
+            Every(), sort, order, page_size, page, use_public_index, view=view
+        )
+        return Page(items=notes, total=total, page=page, page_size=page_size)
 
     def get_notes_by_tag(
         self,
@@ -1057,117 +1185,106 @@ class FileSystemNotes(BaseNotes):
         order: Literal["asc", "desc"] = "desc",
         limit: int = None,
         use_public_index: bool = False,
-    ) -> list[Note]:
-        """Get notes that have a specific tag."""
-        self._sync_index_with_retry()
-        index_to_use = self.public_index if use_public_index else self.main_index
-        
-        # Special handling for "_untagged" tag - return notes without tags
-        if tag_name == "_untagged":
-            with index_to_use.searcher() as searcher:
-                # Get all notes and filter those without tags
-                from whoosh.query import Every
-                query = Every()
-                
-                # Determine sort field
-                sort_field = sort if sort in ["title", "last_modified", "created_time", "category", "visibility"] else "last_modified"
-                
-                # Determine sort direction
-                reverse = order == "desc"
-                
-                # Run search to get all notes
-                results = searcher.search(
-                    query,
-                    sortedby=sort_field,
-                    reverse=reverse,
-                    limit=None,  # Get all notes to filter
-                )
-                
-                # Convert to Note objects and filter those without tags
-                notes = []
-                for hit in results:
-                    filename = hit["filename"]
-                    filepath = os.path.join(self.storage_path, filename)
-                    content = self._read_file(filepath)
-                    metadata, body = parse_markdown_with_frontmatter(content)
-                    
-                    # Only include notes without tags
-                    if not metadata.get('tags', []):
-                        # Parse created date from frontmatter
-                        created_time = None
-                        if 'created_time' in metadata:
-                            try:
-                                created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
-                            except (ValueError, TypeError):
-                                created_time = os.path.getctime(filepath)
-                        else:
-                            created_time = os.path.getctime(filepath)
-                        notes.append(Note(
-                            title=metadata.get('title', self._strip_ext(filename)),
-                            content=body,
-                            last_modified=hit["last_modified"].timestamp(),
-                            created_time=created_time,
-                            tags=metadata.get('tags', []),
-                            filename=filename,
-                            category=metadata.get('category', 'note'),
-                            visibility=metadata.get('visibility', 'private'),
-                        ))
-                
-                # Apply limit after filtering
-                if limit:
-                    notes = notes[:limit]
-                
-                return notes
-        
-        # Regular tag search
-        with index_to_use.searcher() as searcher:
-            # Search for notes with the specific tag
-            from whoosh.query import Term
-            query = Term("tags", tag_name)
-            
+        view: Literal["full", "summary"] = "full",
+    ) -> list[Union[Note, NoteSummary]]:
+        """Get notes that have a specific tag. The summary view returns an
+        excerpt instead of the content."""
+        notes, _ = self._find_notes_by_tag(
+            tag_name, sort, order, limit, None, use_public_index, view
+        )
+        return notes
+
+    def get_notes_by_tag_page(
+        self,
+        tag_name: str,
+        sort: Literal["title", "last_modified", "created_time", "category", "visibility"] = "last_modified",
+        order: Literal["asc", "desc"] = "desc",
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        use_public_index: bool = False,
+        view: Literal["full", "summary"] = "full",
+    ) -> Page[Union[Note, NoteSummary]]:
+        """Get one page of the notes that have a specific tag, numbered from
+        1, along with the total number of such notes."""
+        notes, total = self._find_notes_by_tag(
+            tag_name, sort, order, page_size, page, use_public_index, view
+        )
+        return Page(items=notes, total=total, page=page, page_size=page_size)
+
+    def _find_notes_by_tag(
+        self,
+        tag_name: str,
+        sort: str,
+        order: str,
+        limit: Optional[int],
+        page: Optional[int],
+        use_public_index: bool,
+        view: str,
+    ) -> Tuple[list[Union[Note, NoteSummary]], Optional[int]]:
+        # Notes without tags are indexed under the reserved "_untagged" tag
+        return self._find_notes(
+            Term("tags", tag_name), sort, order, limit, page, use_public_index,
+            view=view,
+        )
+
+    def _find_notes(
+        self,
+        query: Query,
+        sort: str,
+        order: str,
+        limit: Optional[int],
+        page: Optional[int],
+        use_public_index: bool,
+        view: str = "full",
+    ) -> Tuple[list[Union[Note, NoteSummary]], Optional[int]]:
+        """Return the notes matching the given query and the total number of
+        matches (only counted when paging). If `page` is given, `limit` is the
+        page size."""
+        self._sync_pending()
+        with self.searchers.searcher() as searcher:
             # Determine sort field
-            sort_field = sort if sort in ["title", "last_modified", "created_time", "category", "visibility"] else "last_modified"
-            
+            sort_field = sort if sort in SORT_FIELDS else "last_modified"
+
             # Determine sort direction
             reverse = order == "desc"
-            
+
             # Run search
-            results = searcher.search(
+            hits, total = self._search_hits(
+                searcher,
                 query,
+                limit,
+                page,
                 sortedby=sort_field,
                 reverse=reverse,
-                limit=limit,
+                mask=self._visibility_mask(searcher, use_public_index),
             )
-            
+
             # Convert to Note objects
-            notes = []
-            for hit in results:
-                filename = hit["filename"]
-                filepath = os.path.join(self.storage_path, filename)
-                content = self._read_file(filepath)
-                metadata, body = parse_markdown_with_frontmatter(content)
-                
-                # Parse created date from frontmatter
-                created_time = None
-                if 'created_time' in metadata:
-                    try:
-                        created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
-                    except (ValueError, TypeError):
-                        created_time = os.path.getctime(filepath)
-                else:
-                    created_time = os.path.getctime(filepath)
-                notes.append(Note(
-                    title=metadata.get('title', self._strip_ext(filename)),
-                    content=body,
-                    last_modified=hit["last_modified"].timestamp(),
-                    created_time=created_time,
-                    tags=metadata.get('tags', []),
-                    filename=filename,
-                    category=metadata.get('category', 'note'),
-                    visibility=metadata.get('visibility', 'private'),
-                ))
-            
-            return notes
+            if view == "summary":
+                return [self._note_summary_from_fields(hit.fields()) for hit in hits], total
+            return [self._note_from_fields(hit.fields()) for hit in hits], total
+
+    @staticmethod
+    def _search_hits(
+        searcher, query: Query, limit: Optional[int], page: Optional[int], **kwargs
+    ) -> Tuple[list[Hit], Optional[int]]:
+        """Run a search and return the hits and the total number of matches
+        (only counted when paging). If `page` is given, `limit` is the page
+        size."""
+        if page is None:
+            return list(searcher.search(query, limit=limit, **kwargs)), None
+        results = searcher.search_page(
+            query, page, pagelen=limit or DEFAULT_PAGE_SIZE, **kwargs
+        )
+        total = results.total
+        if kwargs.get("terms") and kwargs.get("mask") is not None:
+            # Whoosh also counts masked documents when matched terms are
+            # recorded, so count the matches separately
+            total = len(searcher.search(query, limit=1, mask=kwargs["mask"]))
+        # Whoosh returns the last page for page numbers past the end
+        if results.pagenum < page:
+            return [], total
+        return list(results), total
 
     def get_notes_without_tags(
         self,
@@ -1177,11 +1294,24 @@ class FileSystemNotes(BaseNotes):
         use_public_index: bool = False,
     ) -> list[Note]:
         """Get notes that have no tags."""
-        all_notes = self.list_notes(sort=sort, order=order, limit=None, use_public_index=use_public_index)
-        notes_without_tags = [note for note in all_notes if not note.tags]
-        if limit:
-            notes_without_tags = notes_without_tags[:limit]
-        return notes_without_tags
+        return self.get_notes_by_tag(
+            UNTAGGED, sort=sort, order=order, limit=limit, use_public_index=use_public_index
+        )
+
+    def get_stats(self) -> dict:
+        """Get index and cache statistics for tuning."""
+        return {
+            "index": {
+                "generation": self.main_index.latest_generation(),
+                "watcher": self.watcher.backend,
+            },
+            "tags": len(self.tag_stats.tags()),
+            "search_cache": self.search_cache.stats(),
+            "query_cache": self.query_cache.stats(),
+            "version_cache": self.git_manager.version_cache.stats(),
+            "diff_cache": self.git_manager.diff_cache.stats(),
+            "history_compaction": self.git_manager.compaction_stats,
+        }
 
     # Git history methods
     async def get_history(self, filename: str) -> List[dict]:
@@ -1192,6 +1322,12 @@ class FileSystemNotes(BaseNotes):
         """Get content of specific version."""
         return await self.git_manager.get_note_version(filename, commit_hash)
     
+    async def get_version_diff(
+        self, filename: str, from_commit: str, to_commit: Optional[str] = None, mode: str = "unified"
+    ) -> Optional[str]:
+        """Get the diff between two versions of a note."""
+        return await self.git_manager.get_note_diff(filename, from_commit, to_commit, mode)
+    
     async def restore_version(self, filename: str, commit_hash: str) -> bool:
         """Restore note to specific version."""
         return await self.git_manager.restore_note_version(filename, commit_hash)
@@ -1219,10 +1355,14 @@ class FileSystemNotes(BaseNotes):
         # Parse created date from frontmatter
         created_time = None
         if 'created_time' in metadata:
-            try:
-                created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
-            except (ValueError, TypeError):
-                created_time = os.path.getctime(filepath)
+            # Handle both string and datetime objects
+            if isinstance(metadata['created_time'], datetime):
+                created_time = metadata['created_time'].timestamp()
+            else:
+                try:
+                    created_time = datetime.strptime(metadata['created_time'], '%Y-%m-%d %H:%M:%S').timestamp()
+                except (ValueError, TypeError):
+                    created_time = os.path.getctime(filepath)
         else:
             created_time = os.path.getctime(filepath)
         
@@ -1238,34 +1378,95 @@ class FileSystemNotes(BaseNotes):
             attachment_extension=metadata.get('attachment_extension', ''),
         )
 
-    def _load_index(self, index_name: str) -> Index:
+    def _note_from_fields(self, fields: dict) -> Note:
+        """Build a Note from the stored fields of an indexed document."""
+        filename = fields["filename"]
+        created_time = fields.get("created_time")
+        return Note(
+            title=fields.get("title", self._strip_ext(filename)),
+            content=fields.get("content", ""),
+            last_modified=fields["last_modified"].timestamp(),
+            created_time=created_time.timestamp() if created_time else None,
+            tags=fields.get("tag_list", []),
+            filename=filename,
+            category=fields.get("category", "note"),
+            visibility=fields.get("visibility", "private"),
+            attachment_extension=fields.get("attachment_extension", ""),
+        )
+
+    def _note_summary_from_fields(self, fields: dict) -> NoteSummary:
+        """Build a NoteSummary from the stored fields of an indexed document."""
+        filename = fields["filename"]
+        created_time = fields.get("created_time")
+        return NoteSummary(
+            title=fields.get("title", self._strip_ext(filename)),
+            excerpt=fields.get("excerpt", ""),
+            last_modified=fields["last_modified"].timestamp(),
+            created_time=created_time.timestamp() if created_time else None,
+            tags=fields.get("tag_list", []),
+            filename=filename,
+            category=fields.get("category", "note"),
+            visibility=fields.get("visibility", "private"),
+            attachment_extension=fields.get("attachment_extension", ""),
+        )
+
+    @classmethod
+    def _make_excerpt(cls, content: Optional[str]) -> str:
+        """Return a short plain excerpt of the given note content."""
+        if not content:
+            return ""
+        content_ex_tags, _ = cls._extract_tags(content)
+        excerpt = " ".join(content_ex_tags.split())
+        if len(excerpt) > EXCERPT_LENGTH:
+            excerpt = excerpt[:EXCERPT_LENGTH] + "..."
+        return excerpt
+
+    def _load_index(self) -> Index:
         """Load the note index or create new if not exists."""
-        if index_name == "main":
-            index_path = self._main_index_path
-        elif index_name == "public":
-            index_path = self._public_index_path
-        else:
-            raise ValueError(f"Unknown index name: {index_name}")
-        
+        index_path = self._main_index_path
         index_dir_exists = os.path.exists(index_path)
         if index_dir_exists and whoosh.index.exists_in(
             index_path, indexname=INDEX_SCHEMA_VERSION
         ):
-            logger.info(f"Loading existing {index_name} index")
+            logger.info("Loading existing index")
             return whoosh.index.open_dir(
                 index_path, indexname=INDEX_SCHEMA_VERSION
             )
         else:
             if index_dir_exists:
-                logger.info(f"Deleting outdated {index_name} index")
+                logger.info("Deleting outdated index")
                 self._clear_dir(index_path)
             else:
                 os.makedirs(index_path, exist_ok=True)
-            logger.info(f"Creating new {index_name} index")
+            logger.info("Creating new index")
             return whoosh.index.create_in(
                 index_path, IndexSchema, indexname=INDEX_SCHEMA_VERSION
             )
 
+    def _private_docs(self, searcher) -> BitSet:
+        """Return the docnums of notes that are not public for the searcher's
+        index generation. The set is computed once per generation."""
+        generation = searcher.reader().generation()
+        with self._private_docs_lock:
+            cached = self._private_docs_cache
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+        private_docs = BitSet(
+            searcher.docs_for_query(Not(Term("visibility", "public"))),
+            size=searcher.doc_count_all(),
+        )
+        with self._private_docs_lock:
+            self._private_docs_cache = (generation, private_docs)
+        return private_docs
+
+    def _visibility_mask(self, searcher, use_public_index: bool) -> Optional[BitSet]:
+        """Return the search mask hiding non-public notes when only public
+        notes are requested, otherwise None.
+
+        Note: A mask is used rather than an allow filter as Whoosh ignores
+        empty filters, which would expose every note when none are public."""
+        return self._private_docs(searcher) if use_public_index else None
+
     @classmethod
     def _extract_tags(cls, content) -> Tuple[str, Set[str]]:
         """Strip tags from the given content and return a tuple consisting of:
@@ -1294,19 +1495,38 @@ class FileSystemNotes(BaseNotes):
         """Add a Note object to the index using the given writer. If the
         filename already exists in the index an update will be performed
         instead."""
-        tag_string = " ".join(note.tags or [])
+        # Notes without tags are indexed under the reserved "_untagged" tag so
+        # that they can be found with a term query
+        tag_string = " ".join(note.tags or []) or UNTAGGED
         writer.update_document(
             filename=note.filename or note.title + MARKDOWN_EXT,
             last_modified=datetime.fromtimestamp(note.last_modified),
             created_time=datetime.fromtimestamp(note.created_time) if note.created_time else datetime.fromtimestamp(note.last_modified),
             title=note.title,
             content=note.content,
+            excerpt=self._make_excerpt(note.content),
             tags=tag_string,
+            tag_list=list(note.tags or []),
             category=getattr(note, 'category', 'note'),
             visibility=getattr(note, 'visibility', 'private'),
             attachment_extension=getattr(note, 'attachment_extension', ''),
         )
 
+    def _index_note(self, writer: writing.IndexWriter, filename: str) -> Optional[Note]:
+        """Read the note with the given filename and add it to the index
+        using the given writer. Return None, leaving the index unchanged, if
+        the note no longer exists or cannot be indexed, so that one bad note
+        does not fail a whole batch."""
+        try:
+            note = self._get_by_filename(filename)
+            self._add_note_to_index(writer, note)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to index {filename}, skipping it: {e}")
+            return None
+        return note
+
     def _list_all_note_filenames(self) -> List[str]:
         """Return a list of all note filenames."""
         return [
@@ -1316,19 +1536,35 @@ class FileSystemNotes(BaseNotes):
             )
         ]
 
-    def _sync_index(self, optimize: bool = False, clean: bool = False, visibility_changed: bool = False) -> None:
-        """Synchronize both indexes with the notes directory.
-        Specify clean=True to completely rebuild the indexes"""
-        
-        # Sync main index (always updated)
+    def _sync_index(self, optimize: bool = False, clean: bool = False) -> None:
+        """Synchronize the index with the notes directory.
+        Specify clean=True to completely rebuild the index"""
         self._sync_main_index(optimize=optimize, clean=clean)
-        
-        # Sync public index (conditionally updated)
-        if clean or visibility_changed:
-            self._sync_public_index(optimize=optimize, clean=clean)
-        else:
-            # For regular updates, only sync public index if there are changes
-            self._sync_public_index_if_needed(optimize=optimize)
+        self.manifest.reset(
+            self.storage_path,
+            self._list_all_note_filenames(),
+            self.main_index.latest_generation(),
+        )
+        self.manifest.save()
+        self._rebuild_tag_stats()
+        self.tag_stats.save()
+
+    def _rebuild_tag_stats(self) -> None:
+        """Rebuild the tag statistics from the stored fields of the index."""
+        with self.main_index.searcher() as searcher:
+            self.tag_stats.rebuild(
+                (
+                    {
+                        "filename": fields["filename"],
+                        "title": fields.get("title", self._strip_ext(fields["filename"])),
+                        "last_modified": fields["last_modified"].timestamp(),
+                        "tags": fields.get("tag_list", []),
+                        "public": fields.get("visibility") == "public",
+                    }
+                    for fields in searcher.all_stored_fields()
+                ),
+                searcher.reader().generation(),
+            )
 
     def _sync_main_index(self, optimize: bool = False, clean: bool = False) -> None:
         """Synchronize the main index with the notes directory."""
@@ -1337,7 +1573,8 @@ class FileSystemNotes(BaseNotes):
         if clean:
             writer.mergetype = writing.CLEAR  # Clear the index
         with self.main_index.searcher() as searcher:
-            for idx_note in searcher.all_stored_fields():
+            # A cleared index keeps nothing, so every note is added again
+            for idx_note in () if clean else searcher.all_stored_fields():
                 idx_filename = idx_note["filename"]
                 idx_filepath = os.path.join(self.storage_path, idx_filename)
                 # Delete missing
@@ -1348,9 +1585,7 @@ class FileSystemNotes(BaseNotes):
                     datetime.fromtimestamp(os.path.getmtime(idx_filepath))
                     != idx_note["last_modified"]
                 ):
-                    self._add_note_to_index(
-                        writer, self._get_by_filename(idx_filename)
-                    )
+                    self._index_note(writer, idx_filename)
                     indexed.add(idx_filename)
                 # Ignore already indexed
                 else:
@@ -1358,66 +1593,90 @@ class FileSystemNotes(BaseNotes):
         # Add new
         for filename in self._list_all_note_filenames():
             if filename not in indexed:
-                self._add_note_to_index(
-                    writer, self._get_by_filename(filename)
-                )
+                self._index_note(writer, filename)
         writer.commit(optimize=optimize)
+        self.searchers.invalidate()
 
-    def _sync_public_index(self, optimize: bool = False, clean: bool = False) -> None:
-        """Synchronize the public index with public notes only."""
-        writer = self.public_index.writer()
-        if clean:
-            writer.mergetype = writing.CLEAR  # Clear the index
-        
-        # Get all notes and filter for public ones
-        public_notes = []
-        all_notes = []
-        for filename in self._list_all_note_filenames():
-            note = self._get_by_filename(filename)
-            all_notes.append(note)
-            if getattr(note, 'visibility', 'private') == 'public':
-                public_notes.append(note)
-        
-        # Add all public notes to the index
-        for note in public_notes:
-            self._add_note_to_index(writer, note)
-        
-        writer.commit(optimize=optimize)
+    def _sync_index_with_retry(self, optimize: bool = False, clean: bool = False) -> None:
+        """Queue a synchronization of the whole notes directory and wait for
+        it to be committed."""
+        generation = self.index_writer.submit_full_sync(optimize=optimize, clean=clean)
+        self.index_writer.wait_for_generation(generation)
 
-    def _sync_public_index_if_needed(self, optimize: bool = False) -> None:
-        """Sync public index only if there are changes in public notes."""
-        # Check if public index needs updating by comparing with main index
-        with self.main_index.searcher() as main_searcher:
-            with self.public_index.searcher() as public_searcher:
-                main_public_notes = set()
-                for note in main_searcher.all_stored_fields():
-                    if note.get('visibility') == 'public':
-                        main_public_notes.add(note['filename'])
-                
-                public_notes = set()
-                for note in public_searcher.all_stored_fields():
-                    public_notes.add(note['filename'])
-                
-                # If there are differences, sync the public index
-                if main_public_notes != public_notes:
-                    self._sync_public_index(optimize=optimize)
-
-    def _sync_index_with_retry(
-        self,
-        optimize: bool = False,
-        clean: bool = False,
-        max_retries: int = 8,
-        retry_delay: float = 0.25,
-        visibility_changed: bool = False,
-    ) -> None:
-        for _ in range(max_retries):
-            try:
-                self._sync_index(optimize=optimize, clean=clean)
-                return
-            except LockError:
-                logger.warning(f"Index locked, retrying in {retry_delay}s")
-                time.sleep(retry_delay)
-        logger.error(f"Failed to sync index after {max_retries} retries")
+    def _sync_files(self, filenames: Set[str]) -> None:
+        """Synchronize the index for the given note filenames only."""
+        writer = self.main_index.writer()
+        indexed = {}
+        deleted = set()
+        with self.main_index.searcher() as searcher:
+            for filename in filenames:
+                filepath = os.path.join(self.storage_path, filename)
+                try:
+                    mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
+                except FileNotFoundError:
+                    mtime = None
+                # Delete missing
+                if mtime is None:
+                    writer.delete_by_term("filename", filename)
+                    deleted.add(filename)
+                    continue
+                # Ignore already indexed
+                idx_note = searcher.document(filename=filename)
+                if idx_note and idx_note["last_modified"] == mtime:
+                    continue
+                # Add new or update modified
+                note = self._index_note(writer, filename)
+                if note is not None:
+                    indexed[filename] = note
+        if not indexed and not deleted:
+            writer.cancel()
+            return
+        writer.commit()
+        self.searchers.invalidate()
+
+        generation = self.main_index.latest_generation()
+        for filename in indexed:
+            self.manifest.record(os.path.join(self.storage_path, filename), generation)
+        for filename in deleted:
+            self.manifest.remove(filename, generation)
+        self.manifest.save()
+
+        for filename, note in indexed.items():
+            self.tag_stats.update(
+                filename,
+                note.title,
+                # As stored in the index
+                datetime.fromtimestamp(note.last_modified).timestamp(),
+                note.tags or [],
+                note.visibility == "public",
+                generation,
+            )
+        for filename in deleted:
+            self.tag_stats.remove(filename, generation)
+        self.tag_stats.save()
+
+    def _sync_pending(self, filenames: Iterable[str] = ()) -> None:
+        """Queue the changes collected by the watcher, plus the given
+        filenames, and wait until they are committed to the index. This
+        replaces a full directory scan on every request.
+
+        Changes drained by a concurrent request are waited for as well, so
+        that every request reads its own writes and any change seen by the
+        watcher before it."""
+        with self._sync_lock:
+            # Drain and submit together, so that a request draining nothing
+            # still waits for changes another request has just drained
+            full_rescan, dirty = self.watcher.drain()
+            dirty.update(filenames)
+            if full_rescan:
+                generation = self.index_writer.submit_full_sync()
+            else:
+                generation = self.index_writer.submit(dirty)
+        if not full_rescan and not dirty and self.index_writer.committed_generation >= generation:
+            # Nothing new to wait for
+            return
+        if not self.index_writer.wait_for_generation(generation, timeout=SYNC_TIMEOUT):
+            logger.warning(f"Index sync failed or is taking longer than {SYNC_TIMEOUT}s, serving current results")
 
     @classmethod
     def _pre_process_search_term(cls, term):
@@ -1469,14 +1728,14 @@ class FileSystemNotes(BaseNotes):
             elif os.path.isdir(item_path):
                 shutil.rmtree(item_path)
 
-    def _search_result_from_hit(self, hit: Hit, content_limit: int = None):
+    def _search_result_from_hit(
+        self, hit: Hit, content_limit: int = None, view: str = "full"
+    ):
         matched_fields = self._get_matched_fields(hit.matched_terms())
 
         filename = hit["filename"]
-        filepath = os.path.join(self.storage_path, filename)
-        content = self._read_file(filepath)
-        metadata, body = parse_markdown_with_frontmatter(content)
-        title = metadata.get('title', self._strip_ext(filename))
+        body = hit.get("content", "")
+        title = hit.get("title", self._strip_ext(filename))
         last_modified = hit["last_modified"].timestamp()
 
         # If the search was ordered using a text field then hit.score is the
@@ -1515,13 +1774,20 @@ class FileSystemNotes(BaseNotes):
             content_highlights = None
 
         tag_matches = (
-            [field[1] for field in hit.matched_terms() if field[0] == "tags"]
+            [
+                field[1]
+                for field in hit.matched_terms()
+                # Matched terms are bytes
+                if field[0] == "tags" and field[1] != UNTAGGED.encode()
+            ]
             if "tags" in matched_fields
             else None
         )
 
         # Limit content if content_limit is specified
-        if content_limit and body and len(body) > content_limit:
+        if view == "summary":
+            limited_content = None
+        elif content_limit and body and len(body) > content_limit:
             limited_content = body[:content_limit] + "..."
         else:
             limited_content = body
@@ -1529,15 +1795,50 @@ class FileSystemNotes(BaseNotes):
         return SearchResult(
             title=title,
             content=limited_content,
+            excerpt=hit.get("excerpt", "") if view == "summary" else None,
             last_modified=last_modified,
             filename=filename,
-            tags=metadata.get('tags', []),
+            tags=hit.get("tag_list", []),
             score=score,
             title_highlights=title_highlights,
             content_highlights=content_highlights,
             tag_matches=tag_matches,
         )
 
+    def _parse_query(self, term: str) -> Query:
+        """Parse the pre-processed search term into a query. Parsed queries
+        are cached, except those on date fields as relative dates such as
+        "yesterday" depend on when they are parsed."""
+        fieldnames = tuple(self._fieldnames_for_term(term))
+        key = (fieldnames, term)
+        query = self.query_cache.get(key)
+        if query is None:
+            query = self._parser_for(fieldnames).parse(term)
+            if not any(field + ":" in term for field in DATE_FIELDS):
+                self.query_cache.put(key, query)
+        return query
+
+    def _parser_for(self, fieldnames: Tuple[str, ...]) -> MultifieldParser:
+        """Return the query parser for the given field names, building it on
+        first use."""
+        parser = self._parsers.get(fieldnames)
+        if parser is not None:
+            return parser
+        with self._parsers_lock:
+            parser = self._parsers.get(fieldnames)
+            if parser is None:
+                parser = MultifieldParser(list(fieldnames), self.main_index.schema)
+                parser.add_plugin(DateParserPlugin())
+
+                # Add fuzzy search and wildcard support
+                # Configure fuzzy search with distance 3 (allows more character differences)
+                fuzzy_plugin = FuzzyTermPlugin()
+                fuzzy_plugin.maxdist = 3
+                parser.add_plugin(fuzzy_plugin)
+                parser.add_plugin(WildcardPlugin())
+                self._parsers[fieldnames] = parser
+        return parser
+
     def _fieldnames_for_term(self, term: str) -> List[str]:
         """Return the field names to search in based on the term."""
         # Check for field-specific searches
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterable, Optional, Set, Tuple
+
+from whoosh.index import LockError
+
+from logger import logger
+
+
+class IndexWriteQueue:
+    """A single background thread performing every write to the index.
+
+    Changed note filenames are queued, coalesced and committed together in
+    one batch shortly after the first change arrives, so concurrent saves
+    share a commit instead of competing for the index lock.
+
+    Every batch is numbered with a generation. `submit()` returns the
+    generation that will contain the change and `wait_for_generation()`
+    blocks until it has been committed, which gives callers
+    read-your-writes. If the index is still locked after the retries, the
+    batch is kept for the next one, and its waiters wait for that instead.
+    A batch that fails for any other reason is reported as failed to its
+    waiters rather than as committed."""
+
+    def __init__(
+        self,
+        sync_files: Callable[[Set[str]], None],
+        sync_all: Callable[[bool, bool], None],
+        commit_delay: float = 0.05,
+        max_retries: int = 8,
+        retry_delay: float = 0.25,
+    ):
+        self._sync_files = sync_files
+        self._sync_all = sync_all
+        self.commit_delay = commit_delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._condition = threading.Condition()
+        self._pending: Set[str] = set()
+        self._full_sync: Optional[dict] = None
+        self._pending_generation = 1
+        self._committed_generation = 0
+        # The oldest generation whose changes were kept for the next batch
+        self._retried_generation: Optional[int] = None
+        # (first, last) ranges of the latest generations that failed
+        self._failed: Deque[Tuple[int, int]] = deque(maxlen=64)
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def committed_generation(self) -> int:
+        return self._committed_generation
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="sbnote-index-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Commit anything still queued and stop the writer thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, filenames: Iterable[str]) -> int:
+        """Queue the given note filenames to be reindexed (or removed from the
+        index if they no longer exist) and return the generation that will
+        contain the change. With no filenames, return the generation that
+        will contain everything submitted so far."""
+        with self._condition:
+            filenames = set(filenames)
+            if not filenames:
+                if self._pending or self._full_sync:
+                    return self._pending_generation
+                return self._pending_generation - 1
+            self._pending.update(filenames)
+            self._condition.notify_all()
+            return self._pending_generation
+
+    def submit_full_sync(self, optimize: bool = False, clean: bool = False) -> int:
+        """Queue a synchronization of the whole notes directory and return the
+        generation that will contain it."""
+        with self._condition:
+            full_sync = self._full_sync or {"optimize": False, "clean": False}
+            full_sync["optimize"] |= optimize
+            full_sync["clean"] |= clean
+            self._full_sync = full_sync
+            self._condition.notify_all()
+            return self._pending_generation
+
+    def wait_for_generation(self, generation: int, timeout: float = None) -> bool:
+        """Block until the given generation has been committed. Return False
+        if the timeout expired first or writing the generation failed."""
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._committed_generation >= generation, timeout
+            ):
+                return False
+            return not any(
+                first <= generation <= last for first, last in self._failed
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending or self._full_sync or self._stopping
+                )
+                if self._stopping and not self._pending and not self._full_sync:
+                    return
+            # Give concurrent changes a moment to join this batch
+            if not self._stopping:
+                time.sleep(self.commit_delay)
+            with self._condition:
+                filenames, self._pending = self._pending, set()
+                full_sync, self._full_sync = self._full_sync, None
+                generation = self._pending_generation
+                self._pending_generation += 1
+                first_generation = self._retried_generation or generation
+                self._retried_generation = None
+            try:
+                written = self._write(filenames, full_sync)
+            except Exception as e:
+                logger.error(f"Failed to write to index: {e}")
+                written = False
+            with self._condition:
+                if written is None:
+                    # Kept for the next batch, which its waiters wait for
+                    self._retried_generation = first_generation
+                    continue
+                if not written:
+                    self._failed.append((first_generation, generation))
+                self._committed_generation = generation
+                self._condition.notify_all()
+
+    def _write(self, filenames: Set[str], full_sync: Optional[dict]) -> Optional[bool]:
+        """Write the batch, retrying while the index is locked. Return True
+        once written or None if the changes were queued again."""
+        for _ in range(self.max_retries):
+            try:
+                if full_sync is not None:
+                    # A full sync covers any individually queued files
+                    self._sync_all(full_sync["optimize"], full_sync["clean"])
+                else:
+                    self._sync_files(filenames)
+                return True
+            except LockError:
+                logger.warning(f"Index locked, retrying in {self.retry_delay}s")
+                time.sleep(self.retry_delay)
+        logger.error(f"Index still locked after {self.max_retries} retries, changes will be retried")
+        # Keep the changes queued so that the next batch tries again
+        with self._condition:
+            if full_sync is not None:
+                self._full_sync = self._full_sync or full_sync
+            else:
+                self._pending.update(filenames)
+        return None
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from logger import logger
+
+MANIFEST_VERSION = 1
+
+
+class SyncManifest:
+    """A persisted record of the note files reflected in the index.
+
+    For each note the manifest keeps the mtime, size and content hash of the
+    file as it was indexed, plus the index generation it was committed in.
+    This lets a warm start reindex only the files that changed while SBNote
+    was not running instead of rebuilding the whole index."""
+
+    def __init__(self, path: str, save_interval: float = 30.0):
+        self.path = path
+        self.save_interval = save_interval
+        self.generation: Optional[int] = None
+        self.files: Dict[str, dict] = {}
+        self._schema_version: Optional[str] = None
+        self._dirty = False
+        self._last_saved = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, schema_version: str, generation: int) -> bool:
+        """Load the manifest from disk. Return False if it is missing or does
+        not describe the given index schema version and generation, in which
+        case it cannot be trusted for a warm start."""
+        self._schema_version = schema_version
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info("No sync manifest found")
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read sync manifest: {e}")
+            return False
+        if (
+            data.get("manifest_version") != MANIFEST_VERSION
+            or data.get("schema_version") != schema_version
+        ):
+            logger.info("Sync manifest is outdated")
+            return False
+        if data.get("generation") != generation:
+            logger.info(
+                f"Sync manifest is for index generation {data.get('generation')}, "
+                + f"index is at {generation}"
+            )
+            return False
+        with self._lock:
+            self.generation = generation
+            self.files = data.get("files", {})
+        return True
+
+    def changed_files(self, storage_path: str, extension: str) -> Set[str]:
+        """Return the filenames that were added, modified or deleted since the
+        manifest was written. Files whose mtime or size changed but whose
+        content hash is identical are not reported."""
+        current = {}
+        with os.scandir(storage_path) as entries:
+            for entry in entries:
+                if entry.name.endswith(extension) and entry.is_file():
+                    stat = entry.stat()
+                    current[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = set(self.files.keys() - current.keys())
+        for filename, (mtime, size) in current.items():
+            entry = self.files.get(filename)
+            if entry is None:
+                changed.add(filename)
+            elif (entry["mtime"], entry["size"]) != (mtime, size):
+                filepath = os.path.join(storage_path, filename)
+                if self.hash_file(filepath) == entry["hash"]:
+                    continue
+                changed.add(filename)
+        return changed
+
+    def record(self, filepath: str, generation: int) -> None:
+        """Record the current state of the given note file."""
+        try:
+            stat = os.stat(filepath)
+            file_hash = self.hash_file(filepath)
+        except FileNotFoundError:
+            self.remove(os.path.basename(filepath), generation)
+            return
+        with self._lock:
+            self.files[os.path.basename(filepath)] = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": file_hash,
+                "generation": generation,
+            }
+            self.generation = generation
+            self._dirty = True
+
+    def remove(self, filename: str, generation: int) -> None:
+        """Remove the given note file from the manifest."""
+        with self._lock:
+            self.files.pop(filename, None)
+            self.generation = generation
+            self._dirty = True
+
+    def reset(self, storage_path: str, filenames: Iterable[str], generation: int) -> None:
+        """Replace the manifest contents with the given note files, e.g. after
+        a full rebuild of the index. Only files that are new or whose mtime
+        or size changed are read and hashed again."""
+        with self._lock:
+            previous = self.files
+        files = {}
+        for filename in filenames:
+            filepath = os.path.join(storage_path, filename)
+            try:
+                stat = os.stat(filepath)
+                entry = previous.get(filename)
+                if entry is None or (entry["mtime"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+                    entry = {
+                        "mtime": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "hash": self.hash_file(filepath),
+                    }
+            except FileNotFoundError:
+                continue
+            files[filename] = {**entry, "generation": generation}
+        with self._lock:
+            self.files = files
+            self.generation = generation
+            self._dirty = True
+
+    def save(self, force: bool = False) -> None:
+        """Write the manifest to disk if it has changed. Unless `force` is
+        True, writes are limited to one per `save_interval` seconds."""
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.monotonic() - self._last_saved < self.save_interval:
+                return
+            data = {
+                "manifest_version": MANIFEST_VERSION,
+                "schema_version": self._schema_version,
+                "generation": self.generation,
+                "files": self.files,
+            }
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error(f"Failed to write sync manifest: {e}")
+                return
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+    @staticmethod
+    def hash_file(filepath: str) -> str:
+        with open(filepath, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
@@ -0,0 +1,198 @@
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+from logger import logger
+
+# Try to import cclib, but don't fail if it's not available
+try:
+    import cclib
+    from .ccdata import CCDATA_DIR, save_ccdata
+    CCLIB_AVAILABLE = True
+except ImportError:
+    CCLIB_AVAILABLE = False
+
+def _create_xyz_file(data_obj, xyz_file_path):
+    """Create xyz file from cclib data object using writexyz() method."""
+    try:
+        # Check if writexyz method is available
+        if not hasattr(data_obj, 'writexyz'):
+            logger.warning("writexyz method not available in cclib data object")
+            return False
+
+        # Generate xyz content using cclib's writexyz method
+        # This will use the last (final) coordinate set by default
+        xyz_content = data_obj.writexyz()
+
+        # Write xyz file
+        with open(xyz_file_path, 'w') as f:
+            f.write(xyz_content)
+
+        return True
+
+    except Exception as e:
+        logger.warning(f"Failed to create xyz file: {str(e)}")
+        return False
+
+
+def parse_output(output_dir: str) -> bool:
+    """Parse the output.txt file in the given attachment directory with
+    cclib, save the parsed data to output.ccdata and the final coordinates
+    to output.xyz. Return whether output.xyz was created.
+
+    This runs in a worker process, so only the directory and the result
+    cross the process boundary."""
+    output_file_path = os.path.join(output_dir, "output.txt")
+
+    # Check if output file exists
+    if not os.path.exists(output_file_path):
+        raise FileNotFoundError(f"Output file not found: {output_file_path}")
+
+    # Parse with cclib
+    parser = cclib.io.ccopen(output_file_path)
+    if parser is None:
+        raise ValueError(f"cclib could not determine file format for: {output_file_path}")
+
+    data_obj = parser.parse()
+    if data_obj is None:
+        raise ValueError(f"cclib parsing failed for: {output_file_path}")
+
+    # Save each attribute separately so that it can be read on its own
+    save_ccdata(data_obj, os.path.join(output_dir, CCDATA_DIR))
+
+    # Create xyz file from coordinates
+    return _create_xyz_file(data_obj, os.path.join(output_dir, "output.xyz"))
+
+
+class OutputParseQueue:
+    """Parse uploaded outputs with cclib on a pool of worker processes.
+
+    Large outputs take tens of seconds to parse, so parsing runs outside the
+    server process where it cannot hold up requests. At most `max_jobs`
+    outputs are queued or parsing at a time. When a job finishes, its
+    callback runs on a single background thread, and the job's status stays
+    available until `keep_finished` newer jobs have finished."""
+
+    def __init__(self, workers: int = 2, max_jobs: int = 16, keep_finished: int = 256):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.keep_finished = keep_finished
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        # Callbacks update notes, which may block, so they do not run on the
+        # executor's management thread
+        self._completions = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sbnote-output-parser"
+        )
+        # job id -> {"status", "error", "submitted", "finished"}
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._futures: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        job_id: str,
+        output_dir: str,
+        on_done: Callable[[str, Optional[bool], Optional[BaseException]], None],
+    ) -> bool:
+        """Queue the output in the given attachment directory for parsing.
+        `on_done` is called with the job id and either the result of
+        `parse_output()` or the exception raised. Return False if the queue
+        is full."""
+        with self._lock:
+            if len(self._futures) >= self.max_jobs:
+                return False
+            if self._executor is None:
+                # Workers are spawned rather than forked from a server
+                # running several threads
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            executor = self._executor
+            future = executor.submit(parse_output, output_dir)
+            self._futures[job_id] = future
+            self._jobs.pop(job_id, None)
+            self._jobs[job_id] = {
+                "status": "queued",
+                "error": None,
+                "submitted": time.time(),
+                "finished": None,
+            }
+        future.add_done_callback(
+            lambda future: self._schedule_finish(job_id, future, executor, on_done)
+        )
+        return True
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """Return the status of the given job, one of "queued", "parsing",
+        "done" or "failed", or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            future = self._futures.get(job_id)
+            if future is not None and future.running():
+                job["status"] = "parsing"
+            return job
+
+    def active_jobs(self) -> int:
+        """Return the number of jobs queued or parsing."""
+        with self._lock:
+            return len(self._futures)
+
+    def stop(self) -> None:
+        """Stop the worker processes, abandoning any queued jobs."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._completions.shutdown(wait=False)
+
+    def _schedule_finish(self, *args) -> None:
+        try:
+            self._completions.submit(self._finish, *args)
+        except RuntimeError:
+            # Stopping
+            pass
+
+    def _finish(
+        self,
+        job_id: str,
+        future: concurrent.futures.Future,
+        executor: concurrent.futures.ProcessPoolExecutor,
+        on_done: Callable,
+    ) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A worker died, e.g. out of memory, so start a new pool next time
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+        try:
+            on_done(job_id, None if error else future.result(), error)
+        except Exception as e:
+            logger.error(f"Failed to complete output parsing for {job_id}: {e}")
+            error = error or e
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["status"] = "failed" if error else "done"
+                job["error"] = str(error) if error else None
+                job["finished"] = time.time()
+            # Forget the oldest finished jobs
+            finished = [
+                key for key in self._jobs if key not in self._futures
+            ]
+            for key in finished[:max(len(finished) - self.keep_finished, 0)]:
+                del self._jobs[key]
@@ -0,0 +1,48 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from whoosh.index import Index
+from whoosh.searching import Searcher
+
+
+class SearcherPool:
+    """Long-lived searchers for serving requests.
+
+    Each worker thread keeps its own searcher, as Whoosh searchers share open
+    file handles and are not safe to use from several threads at once. A
+    searcher is only refreshed after `invalidate()` is called for a new index
+    generation, and refreshing reuses the readers of unchanged segments so
+    their open files and caches stay warm between requests."""
+
+    def __init__(self, index: Index):
+        self.index = index
+        self._counter = itertools.count(1)
+        self._generation = 0
+        self._local = threading.local()
+
+    @property
+    def generation(self) -> int:
+        """A counter that changes whenever a new index generation has been
+        committed."""
+        return self._generation
+
+    def invalidate(self) -> None:
+        """Signal that a new index generation has been committed."""
+        self._generation = next(self._counter)
+
+    @contextmanager
+    def searcher(self) -> Iterator[Searcher]:
+        """Yield this thread's searcher. Unlike `Index.searcher()` the searcher
+        is not closed on exit."""
+        local = self._local
+        generation = self._generation
+        searcher = getattr(local, "searcher", None)
+        if searcher is None:
+            searcher = self.index.searcher()
+        elif local.generation != generation:
+            searcher = searcher.refresh()
+        local.searcher = searcher
+        local.generation = generation
+        yield searcher
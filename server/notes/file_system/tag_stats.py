@@ -0,0 +1,224 @@
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from logger import logger
+
+TAG_STATS_VERSION = 1
+UNTAGGED = "_untagged"
+
+
+class TagStats:
+    """A materialized summary of the notes under each tag.
+
+    The index writer applies every added, updated and deleted note to the
+    table after it commits, so the tag dashboard never has to query or scan
+    the notes. The note count per tag is kept up to date on every change and
+    the most recent titles are recomputed only for the tags that changed.
+    Notes without tags are grouped under "_untagged"."""
+
+    def __init__(self, path: str, recent_notes: int = 5, save_interval: float = 30.0):
+        self.path = path
+        self.recent_notes = recent_notes
+        self.save_interval = save_interval
+        self.generation: Optional[int] = None
+        # filename -> {"title", "last_modified", "tags", "public"}
+        self.notes: Dict[str, dict] = {}
+        self._members: Dict[str, Set[str]] = {}
+        # tag -> [count, public count]
+        self._counts: Dict[str, List[int]] = {}
+        self._summaries: Dict[tuple, dict] = {}
+        self._schema_version: Optional[str] = None
+        self._dirty = False
+        self._last_saved = 0.0
+        self._lock = threading.RLock()
+
+    def load(self, schema_version: str, generation: int) -> bool:
+        """Load the table from disk. Return False if it is missing or does
+        not describe the given index schema version and generation, in which
+        case it must be rebuilt."""
+        self._schema_version = schema_version
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read tag statistics: {e}")
+            return False
+        if (
+            data.get("version") != TAG_STATS_VERSION
+            or data.get("schema_version") != schema_version
+            or data.get("generation") != generation
+        ):
+            logger.info("Tag statistics are outdated")
+            return False
+        with self._lock:
+            self._clear()
+            for filename, entry in data.get("notes", {}).items():
+                self._add(filename, entry)
+            self.generation = generation
+        return True
+
+    def rebuild(self, entries: Iterable[dict], generation: int) -> None:
+        """Replace the table contents with the given notes, each a dict with
+        the keys filename, title, last_modified, tags and public."""
+        with self._lock:
+            self._clear()
+            for entry in entries:
+                entry = dict(entry)
+                self._add(entry.pop("filename"), entry)
+            self.generation = generation
+            self._dirty = True
+
+    def update(
+        self,
+        filename: str,
+        title: str,
+        last_modified: float,
+        tags: Iterable[str],
+        public: bool,
+        generation: int = None,
+    ) -> None:
+        """Add or replace the given note."""
+        with self._lock:
+            self._remove(filename)
+            self._add(
+                filename,
+                {
+                    "title": title,
+                    "last_modified": last_modified,
+                    "tags": sorted(set(tags)),
+                    "public": public,
+                },
+            )
+            self._touch(generation)
+
+    def remove(self, filename: str, generation: int = None) -> None:
+        """Remove the given note."""
+        with self._lock:
+            self._remove(filename)
+            self._touch(generation)
+
+    def get(self, use_public_index: bool = False) -> Dict[str, dict]:
+        """Return the note count, the titles of the most recently modified
+        notes and the most recent modification time for each tag in use,
+        ordered by tag with "_untagged" last."""
+        with self._lock:
+            tags = sorted(tag for tag in self._counts if tag != UNTAGGED)
+            if UNTAGGED in self._counts:
+                tags.append(UNTAGGED)
+            stats = {}
+            for tag in tags:
+                summary = self._summary(tag, use_public_index)
+                if summary is not None:
+                    stats[tag] = summary
+            return stats
+
+    def tags(self, use_public_index: bool = False) -> List[str]:
+        """Return the tags used by at least one note."""
+        position = 1 if use_public_index else 0
+        with self._lock:
+            return sorted(
+                tag
+                for tag, counts in self._counts.items()
+                if tag != UNTAGGED and counts[position]
+            )
+
+    def has_untagged(self, use_public_index: bool = False) -> bool:
+        """Return whether any note has no tags."""
+        position = 1 if use_public_index else 0
+        with self._lock:
+            return bool(self._counts.get(UNTAGGED, (0, 0))[position])
+
+    def save(self, force: bool = False) -> None:
+        """Write the table to disk if it has changed. Unless `force` is True,
+        writes are limited to one per `save_interval` seconds."""
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.monotonic() - self._last_saved < self.save_interval:
+                return
+            data = {
+                "version": TAG_STATS_VERSION,
+                "schema_version": self._schema_version,
+                "generation": self.generation,
+                "notes": self.notes,
+            }
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error(f"Failed to write tag statistics: {e}")
+                return
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+    def _summary(self, tag: str, use_public_index: bool) -> Optional[dict]:
+        count = self._counts[tag][1 if use_public_index else 0]
+        if not count:
+            return None
+        key = (tag, use_public_index)
+        summary = self._summaries.get(key)
+        if summary is None:
+            entries = [
+                self.notes[filename]
+                for filename in self._members[tag]
+                if not use_public_index or self.notes[filename]["public"]
+            ]
+            recent = heapq.nlargest(
+                self.recent_notes, entries, key=lambda entry: entry["last_modified"]
+            )
+            summary = {
+                "count": count,
+                "notes": [entry["title"] for entry in recent],
+                "recent_modified": recent[0]["last_modified"],
+            }
+            self._summaries[key] = summary
+        return summary
+
+    def _add(self, filename: str, entry: dict) -> None:
+        self.notes[filename] = entry
+        for tag in entry["tags"] or [UNTAGGED]:
+            self._members.setdefault(tag, set()).add(filename)
+            counts = self._counts.setdefault(tag, [0, 0])
+            counts[0] += 1
+            if entry["public"]:
+                counts[1] += 1
+            self._invalidate(tag)
+
+    def _remove(self, filename: str) -> None:
+        entry = self.notes.pop(filename, None)
+        if entry is None:
+            return
+        for tag in entry["tags"] or [UNTAGGED]:
+            members = self._members[tag]
+            members.discard(filename)
+            counts = self._counts[tag]
+            counts[0] -= 1
+            if entry["public"]:
+                counts[1] -= 1
+            if not members:
+                del self._members[tag]
+                del self._counts[tag]
+            self._invalidate(tag)
+
+    def _invalidate(self, tag: str) -> None:
+        self._summaries.pop((tag, False), None)
+        self._summaries.pop((tag, True), None)
+
+    def _touch(self, generation: Optional[int]) -> None:
+        if generation is not None:
+            self.generation = generation
+        self._dirty = True
+
+    def _clear(self) -> None:
+        self.notes = {}
+        self._members = {}
+        self._counts = {}
+        self._summaries = {}
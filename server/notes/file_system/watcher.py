@@ -0,0 +1,214 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from logger import logger
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class NotesWatcher:
+    """Watch the notes directory and collect the filenames of notes that
+    changed, whether they were written by SBNote or edited externally.
+
+    inotify is used where available, otherwise the directory is polled in a
+    background thread. Readers call `drain()` to take the pending changes."""
+
+    def __init__(
+        self,
+        path: str,
+        extension: str,
+        mode: str = "auto",
+        poll_interval: float = 2.0,
+    ):
+        self.path = path
+        self.extension = extension
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.backend: Optional[str] = None
+        self._dirty: Set[str] = set()
+        self._full_rescan = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+
+    def start(self) -> None:
+        """Start watching in a background thread."""
+        if self._thread is not None:
+            return
+        if self.mode in ("auto", "inotify"):
+            fd = self._inotify_open()
+            if fd is not None:
+                self.backend = "inotify"
+                self._thread = threading.Thread(
+                    target=self._run_inotify,
+                    args=(fd,),
+                    name="sbnote-watcher",
+                    daemon=True,
+                )
+            elif self.mode == "inotify":
+                logger.warning("inotify is not available, falling back to polling")
+        if self._thread is None:
+            self.backend = "polling"
+            self._snapshot = self._scan()
+            self._thread = threading.Thread(
+                target=self._run_polling, name="sbnote-watcher", daemon=True
+            )
+        self._thread.start()
+        logger.info(f"Watching '{self.path}' for changes ({self.backend})")
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def mark(self, filenames: Iterable[str]) -> None:
+        """Mark the given note filenames as changed."""
+        with self._lock:
+            self._dirty.update(filenames)
+
+    def request_full_rescan(self) -> None:
+        """Ask the next reader to resynchronise the whole directory, e.g.
+        after events were lost."""
+        with self._lock:
+            self._full_rescan = True
+
+    def drain(self) -> Tuple[bool, Set[str]]:
+        """Return and reset the pending changes as a tuple of:
+
+        - Whether a full rescan is required.
+        - The set of changed filenames."""
+        with self._lock:
+            full_rescan, dirty = self._full_rescan, self._dirty
+            self._full_rescan = False
+            self._dirty = set()
+        return full_rescan, dirty
+
+    def _is_note(self, filename: str) -> bool:
+        return filename.endswith(self.extension) and not filename.startswith(".")
+
+    # region inotify
+    def _inotify_open(self) -> Optional[int]:
+        """Return an inotify file descriptor watching the notes directory or
+        None if inotify cannot be used on this platform."""
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            wd = libc.inotify_add_watch(
+                fd, os.fsencode(self.path), ctypes.c_uint32(WATCH_MASK)
+            )
+            if wd < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _run_inotify(self, fd: int) -> None:
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([fd], [], [], 1.0)
+                if not readable:
+                    continue
+                try:
+                    buffer = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._handle_inotify_events(buffer)
+        except Exception as e:
+            logger.error(f"inotify watcher stopped unexpectedly: {e}")
+            self.request_full_rescan()
+        finally:
+            os.close(fd)
+
+    def _handle_inotify_events(self, buffer: bytes) -> None:
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            _, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, scheduling full rescan")
+                self.request_full_rescan()
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                logger.warning(f"'{self.path}' is no longer watched, scheduling full rescan")
+                self.request_full_rescan()
+            elif name:
+                filename = os.fsdecode(name)
+                if self._is_note(filename):
+                    changed.add(filename)
+        if changed:
+            self.mark(changed)
+
+    # endregion
+
+    # region Polling
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Return a mapping of filename to (mtime_ns, size) for all notes."""
+        snapshot = {}
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if not self._is_note(entry.name):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _run_polling(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                snapshot = self._scan()
+                changed = {
+                    filename
+                    for filename in snapshot.keys() | self._snapshot.keys()
+                    if snapshot.get(filename) != self._snapshot.get(filename)
+                }
+                self._snapshot = snapshot
+                if changed:
+                    self.mark(changed)
+            except Exception as e:
+                logger.error(f"Polling watcher failed: {e}")
+                self.request_full_rescan()
+
+    # endregion
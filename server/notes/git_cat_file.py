@@ -0,0 +1,96 @@
+import subprocess
+import threading
+from typing import Optional, Tuple
+
+from logger import logger
+
+
+class GitCatFile:
+    """A long-lived `git cat-file --batch` process reading objects from a
+    repository.
+
+    Objects are requested by name on the process's stdin, so reading a note
+    version does not fork and exec Git every time. Requests are serialized,
+    the process is started on first use and restarted if it exits or a
+    request times out."""
+
+    def __init__(self, repo_path: str, timeout: float = 30.0):
+        self.repo_path = repo_path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Return the contents of the given object, a hash or any name Git
+        accepts such as `<commit>:<path>`, or None if it does not exist."""
+        result = self._request(name)
+        return None if result is None else result[1]
+
+    def object_id(self, name: str) -> Optional[str]:
+        """Return the full hash of the given object, or None if it does not
+        exist."""
+        result = self._request(name)
+        return None if result is None else result[0]
+
+    def _request(self, name: str) -> Optional[Tuple[str, bytes]]:
+        if not name or "\n" in name:
+            raise ValueError(f"Invalid object name: {name!r}")
+        with self._lock:
+            process = self._ensure_process()
+            # Kill the process if Git stalls, which unblocks the read below
+            timer = threading.Timer(self.timeout, process.kill)
+            timer.start()
+            try:
+                process.stdin.write(name.encode("utf-8") + b"\n")
+                process.stdin.flush()
+                header = process.stdout.readline()
+                if not header.endswith(b"\n"):
+                    raise EOFError("git cat-file exited")
+                if header.endswith((b" missing\n", b" ambiguous\n")):
+                    return None
+                # "<object id> <type> <size>"
+                object_id, _, size = header.split()
+                size = int(size)
+                content = process.stdout.read(size + 1)
+                if len(content) != size + 1:
+                    raise EOFError("git cat-file exited")
+                return object_id.decode("ascii"), content[:size]
+            except (OSError, EOFError, ValueError) as e:
+                self._close_process()
+                if not timer.is_alive():
+                    raise subprocess.TimeoutExpired(["git", "cat-file", "--batch"], self.timeout)
+                raise subprocess.SubprocessError(f"git cat-file failed: {e}")
+            finally:
+                timer.cancel()
+
+    def close(self) -> None:
+        """Stop the process."""
+        with self._lock:
+            self._close_process()
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            logger.debug("Starting git cat-file process")
+            self._process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._process
+
+    def _close_process(self) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from logger import logger
+
+AUTOSAVE_PREFIX = "Auto-save:"
+
+
+class GitCommitScheduler:
+    """Coalesce note changes into periodic Git commits.
+
+    Changes are collected per note for `window` seconds after the first one
+    arrives and then committed together, so an editor autosaving every few
+    seconds produces one commit per window rather than one per save. Later
+    changes to the same note replace the pending commit message, except
+    that an autosave never replaces another message, which history
+    compaction would then squash.
+
+    Repository maintenance runs every `maintenance_interval` seconds if
+    anything was committed since it last ran, instead of after every
+    commit."""
+
+    def __init__(
+        self,
+        commit: Callable[[Dict[str, str]], None],
+        maintenance: Callable[[], None],
+        window: float = 5.0,
+        maintenance_interval: float = 3600.0,
+    ):
+        self._commit = commit
+        self._maintenance = maintenance
+        self.window = window
+        self.maintenance_interval = maintenance_interval
+        self._condition = threading.Condition()
+        self._pending: Dict[str, str] = {}
+        self._first_change: Optional[float] = None
+        self._flush_requested = 0
+        self._flushed = 0
+        # Whether a batch taken from _pending is being committed
+        self._in_flight = False
+        self._committed_since_maintenance = False
+        self._next_maintenance = time.monotonic() + maintenance_interval
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the scheduler thread."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="sbnote-git-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Commit anything still pending and stop the scheduler thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def schedule(self, filenames: Iterable[str], message: str) -> None:
+        """Queue the given note filenames to be committed with the given
+        message."""
+        with self._condition:
+            for filename in filenames:
+                pending = self._pending.get(filename)
+                if (
+                    pending is not None
+                    and message.startswith(AUTOSAVE_PREFIX)
+                    and not pending.startswith(AUTOSAVE_PREFIX)
+                ):
+                    continue
+                self._pending[filename] = message
+            if self._first_change is None and self._pending:
+                self._first_change = time.monotonic()
+            self._condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Commit everything pending now and wait until it is done, including
+        a batch already being committed. Return False if the timeout expired
+        first."""
+        with self._condition:
+            if not self._pending:
+                return self._condition.wait_for(
+                    lambda: not self._in_flight, timeout
+                )
+            self._flush_requested += 1
+            target = self._flush_requested
+            self._condition.notify_all()
+            return self._condition.wait_for(
+                lambda: self._flushed >= target, timeout
+            )
+
+    def _due(self) -> bool:
+        if self._stopping or self._flush_requested > self._flushed:
+            return True
+        return (
+            self._first_change is not None
+            and time.monotonic() - self._first_change >= self.window
+        )
+
+    def _timeout(self) -> float:
+        now = time.monotonic()
+        timeout = self._next_maintenance - now
+        if self._first_change is not None:
+            timeout = min(timeout, self._first_change + self.window - now)
+        return max(timeout, 0)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._due() and time.monotonic() < self._next_maintenance:
+                    self._condition.wait(self._timeout())
+                changes, self._pending = self._pending, {}
+                self._first_change = None
+                flush_target = self._flush_requested
+                stopping = self._stopping
+                self._in_flight = bool(changes)
+            if changes:
+                try:
+                    self._commit(changes)
+                    self._committed_since_maintenance = True
+                except Exception as e:
+                    logger.error(f"Failed to commit note changes: {e}")
+            with self._condition:
+                self._flushed = flush_target
+                self._in_flight = False
+                self._condition.notify_all()
+            if stopping:
+                return
+            if time.monotonic() >= self._next_maintenance:
+                self._next_maintenance = time.monotonic() + self.maintenance_interval
+                if self._committed_since_maintenance:
+                    self._committed_since_maintenance = False
+                    try:
+                        self._maintenance()
+                    except Exception as e:
+                        logger.error(f"Git maintenance failed: {e}")
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Generic, List, Optional, TypeVar
 
 from pydantic import Field
 from pydantic.functional_validators import AfterValidator
@@ -6,6 +6,10 @@ from typing_extensions import Annotated
 
 from helpers import CustomBaseModel
 
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 50
+
 
 class NoteBase(CustomBaseModel):
     title: str
@@ -31,6 +35,18 @@ class Note(CustomBaseModel):
     attachment_extension: Optional[str] = Field("")
 
 
+class NoteSummary(CustomBaseModel):
+    title: str
+    excerpt: str = Field("")
+    last_modified: float
+    created_time: Optional[float] = Field(None)
+    tags: Optional[List[str]] = Field(default_factory=list)
+    filename: Optional[str] = Field(None)
+    category: Optional[str] = Field("note")
+    visibility: Optional[str] = Field("private")
+    attachment_extension: Optional[str] = Field("")
+
+
 class NoteUpdate(CustomBaseModel):
     new_title: Optional[str] = Field(None)
     new_content: Optional[str] = Field(None)
@@ -67,6 +83,7 @@ class NotePasteImport(CustomBaseModel):
 class SearchResult(CustomBaseModel):
     title: str
     content: Optional[str] = Field(None)
+    excerpt: Optional[str] = Field(None)
     last_modified: float
     filename: Optional[str] = Field(None)
     tags: Optional[List[str]] = Field(default_factory=list)
@@ -75,3 +92,14 @@ class SearchResult(CustomBaseModel):
     title_highlights: Optional[str] = Field(None)
     content_highlights: Optional[str] = Field(None)
     tag_matches: Optional[List[str]] = Field(None)
+
+
+class Page(CustomBaseModel, Generic[T]):
+    items: List[T]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def page_count(self) -> int:
+        return -(-self.total // self.page_size)
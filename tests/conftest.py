@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The server is run with --app-dir server, so its modules import each other
+# by absolute name
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
@@ -0,0 +1,45 @@
+import os
+
+from notes.file_system.manifest import SyncManifest
+
+
+def write_note(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_reset_hashes_only_new_and_changed_files(tmp_path, monkeypatch):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    write_note(notes / "a.md", "first")
+    write_note(notes / "b.md", "second")
+    manifest = SyncManifest(str(tmp_path / "manifest.json"))
+    manifest.reset(str(notes), ["a.md", "b.md"], 1)
+
+    hashed = []
+    hash_file = SyncManifest.hash_file
+    monkeypatch.setattr(
+        SyncManifest,
+        "hash_file",
+        staticmethod(lambda filepath: hashed.append(os.path.basename(filepath)) or hash_file(filepath)),
+    )
+    write_note(notes / "b.md", "second, edited")
+    write_note(notes / "c.md", "third")
+    manifest.reset(str(notes), ["a.md", "b.md", "c.md"], 2)
+
+    assert sorted(hashed) == ["b.md", "c.md"]
+    assert manifest.files["a.md"]["hash"] == hash_file(str(notes / "a.md"))
+    assert manifest.files["b.md"]["hash"] == hash_file(str(notes / "b.md"))
+    assert {entry["generation"] for entry in manifest.files.values()} == {2}
+    assert manifest.changed_files(str(notes), ".md") == set()
+
+
+def test_reset_drops_missing_files(tmp_path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    write_note(notes / "a.md", "first")
+    manifest = SyncManifest(str(tmp_path / "manifest.json"))
+    manifest.reset(str(notes), ["a.md"], 1)
+    os.remove(notes / "a.md")
+    manifest.reset(str(notes), ["a.md"], 2)
+    assert manifest.files == {}
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from notes.file_system import FileSystemNotes
+
+MARKDOWN = "---\ntitle: {title}\ntags:\n- test\n---\n\nbody\n"
+
+
+@pytest.fixture
+def notes(tmp_path, monkeypatch):
+    monkeypatch.setenv("SBNOTE_PATH", str(tmp_path))
+    # Changes are only reported by the tests themselves
+    monkeypatch.setenv("SBNOTE_WATCH_MODE", "polling")
+    monkeypatch.setenv("SBNOTE_WATCH_POLL_INTERVAL", "3600")
+    fs = FileSystemNotes()
+    # Keep each batch queued long enough for another request to arrive
+    fs.index_writer.commit_delay = 0.3
+    yield fs
+    fs.index_writer.stop()
+    fs.watcher.stop()
+    fs.git_manager.stop()
+    fs.output_parser.stop()
+
+
+def write_note(fs, filename):
+    with open(f"{fs.storage_path}/{filename}", "w", encoding="utf-8") as f:
+        f.write(MARKDOWN.format(title=filename))
+
+
+def is_indexed(fs, filename):
+    with fs.main_index.searcher() as searcher:
+        return searcher.document(filename=filename) is not None
+
+
+def drain_concurrently(fs, caller):
+    """Make another request sync as soon as `caller` drains the watcher,
+    and let it drain first if it can. Return the other request's thread."""
+    drain = fs.watcher.drain
+    other_drained = threading.Event()
+    other = threading.Thread(target=fs._sync_pending)
+
+    def interleaved_drain():
+        if threading.current_thread() is other:
+            result = drain()
+            other_drained.set()
+            return result
+        if threading.current_thread() is caller and not other.is_alive():
+            other.start()
+            # The other request may be unable to drain until this one is done
+            other_drained.wait(0.2)
+        return drain()
+
+    fs.watcher.drain = interleaved_drain
+    return other
+
+
+def test_writer_waits_for_its_change_drained_by_another_request(notes):
+    write_note(notes, "a.md")
+    notes.watcher.mark(["a.md"])
+    other = drain_concurrently(notes, threading.current_thread())
+
+    notes._sync_pending(["a.md"])
+
+    assert is_indexed(notes, "a.md")
+    other.join()
+
+
+def test_reader_waits_for_changes_drained_by_another_request(notes):
+    write_note(notes, "b.md")
+    notes.watcher.mark(["b.md"])
+    drain = notes.watcher.drain
+    drained = threading.Event()
+
+    def drain_and_signal():
+        result = drain()
+        drained.set()
+        return result
+
+    notes.watcher.drain = drain_and_signal
+    other = threading.Thread(target=notes._sync_pending)
+    other.start()
+    # The other request has taken the change but not committed it yet
+    drained.wait()
+    notes.watcher.drain = drain
+
+    notes._sync_pending()
+
+    assert is_indexed(notes, "b.md")
+    other.join()